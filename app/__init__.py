@@ -109,6 +109,12 @@ def create_app(config_object=config):
     # Start Resource Monitor (Background Thread)
     start_resource_monitoring_service()
     
+    # Start Recording Finalization Queue (Background Workers)
+    start_finalization_service(app)
+    
+    # Pre-connect enabled cameras (Warm Pool, config warm_camera_pool)
+    start_camera_warm_pool()
+    
     # Register blueprints
     register_blueprints(app)
     
@@ -152,6 +158,10 @@ def init_database(app):
         check_and_migrate_db(app)
         print(f"[Flask] Database initialized at {config.DATABASE_FILE}")
         
+        # Resume finalization jobs interrupted by a restart
+        from app.services.finalization_service import finalization_queue
+        finalization_queue.recover_pending()
+        
         # Create default admin if no users exist
         from app.models import User
         if User.query.count() == 0:
@@ -227,3 +237,21 @@ def start_resource_monitoring_service():
         print("[ResourceMonitor] Service started")
     except Exception as e:
         print(f"[ResourceMonitor] Failed to start: {e}")
+
+
+def start_camera_warm_pool():
+    """Start background bring-up of the warm camera pool"""
+    try:
+        from app.services.camera_service import start_warm_camera_pool
+        start_warm_camera_pool()
+    except Exception as e:
+        print(f"[Camera] Warm pool failed to start: {e}")
+
+
+def start_finalization_service(app):
+    """Start the recording finalization queue"""
+    try:
+        from app.services.finalization_service import start_finalization_worker
+        start_finalization_worker(app)
+    except Exception as e:
+        print(f"[Finalize] Failed to start: {e}")
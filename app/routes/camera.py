@@ -11,7 +11,8 @@ from flask_login import login_required
 from app.services.camera_service import (
     detect_local_cameras, perform_camera_discovery,
     get_camera_stream, gen_frames, camera_status_cache,
-    status_cache_lock
+    status_cache_lock, parse_rendition, live_stream_url, get_camera_stats,
+    get_camera_pool_status, capture_scheduler
 )
 import config
 import gevent
@@ -40,8 +41,9 @@ def camera_settings():
 @camera_bp.route('/api/cameras/detect-local')
 @login_required
 def api_detect_local_cameras():
-    """Detect local USB/webcams"""
-    cameras = detect_local_cameras()
+    """Detect local USB/webcams (cached; ?refresh=1 re-enumerates)"""
+    refresh = request.args.get('refresh', 0, type=int) == 1
+    cameras = detect_local_cameras(refresh=refresh)
     return jsonify({'cameras': cameras})
 
 
@@ -83,9 +85,10 @@ def api_cameras_status():
                 
                 # 1. FAST CHECK: Is it already streaming?
                 is_active_streaming = False
+                live_url = live_stream_url(cam_url)
                 with camera_lock:
-                    if cam_url in active_cameras:
-                        cam_obj = active_cameras[cam_url]
+                    if live_url in active_cameras:
+                        cam_obj = active_cameras[live_url]
                         if cam_obj.running:
                             is_online = True
                             is_active_streaming = True
@@ -100,6 +103,7 @@ def api_cameras_status():
                 elif str(cam_url).isdigit():
                     idx = int(cam_url)
                     from app.services.camera_service import safe_hardware_lock
+                    from app.services.local_capture import local_capture_backends
                     try:
                         # Allow more time for hardware to wake up (3.0s)
                         # Some cheap USB cams are slow to initialize
@@ -109,26 +113,18 @@ def api_cameras_status():
                                 msg = "Busy (Hardware Locked)"
                             else:
                                 import cv2
-                                # Try DSHOW first
-                                cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-                                if cap.isOpened():
-                                    time.sleep(0.2) # Give it a moment to sync
-                                    ret, _ = cap.read()
-                                    if ret:
-                                        is_online = True
-                                        msg = "Ready (DSHOW)"
-                                    cap.release()
-                                
-                                if not is_online:
-                                    # Fallback MSMF
-                                    cap = cv2.VideoCapture(idx, cv2.CAP_MSMF)
+                                # DSHOW then MSMF on Windows, V4L2 on Linux
+                                for name, backend in local_capture_backends():
+                                    cap = cv2.VideoCapture(idx, backend)
                                     if cap.isOpened():
-                                        time.sleep(0.2)
+                                        time.sleep(0.2) # Give it a moment to sync
                                         ret, _ = cap.read()
                                         if ret:
                                             is_online = True
-                                            msg = "Ready (MSMF)"
-                                        cap.release()
+                                            msg = f"Ready ({name})"
+                                    cap.release()
+                                    if is_online:
+                                        break
                     except:
                         pass
 
@@ -215,12 +211,40 @@ def api_cameras_status():
             t.join(timeout=6.0)
 
     with status_cache_lock:
-        statuses = list(camera_status_cache.values())
+        statuses = [dict(status) for status in camera_status_cache.values()]
+    
+    # Warm pool: is a connection already open (warm) or would first use pay bring-up (cold)?
+    pool = get_camera_pool_status()
+    for status in statuses:
+        if status.get('url') in pool:
+            status['pool'] = pool[status['url']]
     
     return jsonify({
         'success': True,
         'cameras': statuses,
-        'count': len(statuses)
+        'count': len(statuses),
+        'pool': pool
+    })
+
+
+@camera_bp.route('/api/cameras/stats')
+@login_required
+def api_cameras_stats():
+    """
+    Capture telemetry of active cameras (fps, read/encode latency, JPEG size,
+    dropped/duplicated frames, per-viewer and per-recorder lag) and
+    capture scheduler occupancy.
+    Optional: ?url= for a single camera
+    """
+    url = request.args.get('url')
+    stats = get_camera_stats(url)
+    if url and not stats:
+        return jsonify({'success': False, 'error': 'Camera not active'}), 404
+    return jsonify({
+        'success': True,
+        'cameras': stats,
+        'count': len(stats),
+        'scheduler': capture_scheduler.get_stats()
     })
 
 
@@ -231,9 +255,12 @@ def camera_feed(camera_url):
     processing_mode = request.args.get('type')
     camera = get_camera_stream(camera_url)
     if camera is None:
+        if capture_scheduler.at_capacity():
+            return jsonify({'error': f'Camera limit reached ({capture_scheduler.max_cameras} active)'}), 503
         return jsonify({'error': 'Camera not available'}), 404
     
-    return Response(gen_frames(camera, processing_mode=processing_mode),
+    rendition = parse_rendition(request.args, processing_mode)
+    return Response(gen_frames(camera, processing_mode=processing_mode, rendition=rendition),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
@@ -266,11 +293,16 @@ def video_feed():
         
         if not camera:
             # Return proper HTTP error to trigger img.onerror in browser
+            if capture_scheduler.at_capacity():
+                print(f"[video_feed] Camera {url} rejected: camera limit reached, returning 503")
+                return f"Camera limit reached ({capture_scheduler.max_cameras} active)", 503
             from flask import abort
             print(f"[video_feed] Camera {url} failed to initialize, returning 503")
             abort(503)  # Service Unavailable - triggers onerror
             
-        return Response(stream_with_context(gen_frames(camera, processing_mode=processing_mode)),
+        # Each viewer picks its own JPEG rendition (?rendition=preview|scan|record or ?w=&q=&zoom=)
+        rendition = parse_rendition(request.args, processing_mode)
+        return Response(stream_with_context(gen_frames(camera, processing_mode=processing_mode, rendition=rendition)),
                         mimetype='multipart/x-mixed-replace; boundary=frame')
     except Exception as e:
         print(f"[video_feed] CRITICAL ERROR: {e}")
@@ -287,23 +319,23 @@ def api_camera_release():
     url = data.get('url', '')
     
     from app.services.camera_service import (
-        active_cameras, camera_lock, 
-        camera_usage, camera_usage_lock
+        retire_camera, retire_recording_camera, camera_usage, camera_usage_lock
     )
     
-    with camera_lock:
-        if url in active_cameras:
-            print(f"[Camera] Explicit release requested for: {url}")
-            active_cameras[url].stop()
-            del active_cameras[url]
-            
-            # Clear camera usage when releasing
-            with camera_usage_lock:
-                if url in camera_usage:
-                    print(f"[Camera] Clearing usage info for: {url}")
-                    del camera_usage[url]
-            
-            return jsonify({'success': True})
+    # Paired camera: an idle main-stream camera left by a recorder goes too
+    retire_recording_camera(url)
+    stream_url = live_stream_url(url)
+    # Unregistered now, stopped in the background (does not block other cameras)
+    if retire_camera(stream_url):
+        print(f"[Camera] Explicit release requested for: {stream_url}")
+        
+        # Clear camera usage when releasing
+        with camera_usage_lock:
+            if url in camera_usage:
+                print(f"[Camera] Clearing usage info for: {url}")
+                del camera_usage[url]
+        
+        return jsonify({'success': True})
             
     return jsonify({'success': True, 'message': 'Camera not active'})
 
@@ -318,6 +350,7 @@ def api_camera_check():
         
     from app.services.camera_service import active_cameras, camera_lock
     
+    url = live_stream_url(url)
     with camera_lock:
         if url in active_cameras:
             cam = active_cameras[url]
@@ -331,7 +364,7 @@ def api_camera_check():
                 if (current_time - cam.last_update) < 5.0:
                     is_healthy = True
             
-            return jsonify({'active': is_healthy})
+            return jsonify({'active': is_healthy, 'viewers': cam.hub.subscriber_count})
                 
     return jsonify({'active': False})
 
@@ -345,6 +378,8 @@ def api_camera_capture():
     
     camera = get_camera_stream(url)
     if camera is None:
+        if capture_scheduler.at_capacity():
+            return jsonify({'success': False, 'error': f'Camera limit reached ({capture_scheduler.max_cameras} active)'}), 503
         return jsonify({'success': False, 'error': 'Camera not available'})
     
     # Get frame
@@ -353,15 +388,16 @@ def api_camera_capture():
         return jsonify({'success': False, 'error': 'Failed to capture frame'})
     
     # Encode to Base64
-    import cv2
     import base64
     import time
     
     # Compress to jpg
-    # ret, buffer = cv2.imencode('.jpg', frame)
-    from app.services.camera_service import run_cv
-    ret, buffer = run_cv(cv2.imencode, '.jpg', frame)
-    if not ret:
+    from app.services.camera_service import run_cv, jpeg_encoder, CapacityError
+    try:
+        buffer = run_cv(jpeg_encoder.encode, frame, 95)
+    except CapacityError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    if not buffer:
         return jsonify({'success': False, 'error': 'Failed to encode image'})
         
     # Valid image bytes
@@ -390,6 +426,7 @@ def api_camera_zoom():
     
     from app.services.camera_service import active_cameras, camera_lock
     
+    url = live_stream_url(url)
     with camera_lock:
         if url in active_cameras:
             cam = active_cameras[url]
@@ -439,6 +476,7 @@ def api_camera_heartbeat():
             
         from app.services.camera_service import active_cameras, camera_lock
         
+        url = live_stream_url(url)
         with camera_lock:
             if url in active_cameras:
                 active_cameras[url].update_heartbeat()
@@ -547,6 +585,7 @@ def api_cameras_add():
     
     name = data.get('name', '').strip()
     url = data.get('url', '').strip()
+    sub_url = (data.get('sub_url') or '').strip()
     enabled = data.get('enabled', True)
     
     if not name:
@@ -574,6 +613,9 @@ def api_cameras_add():
         'url': url,
         'enabled': enabled
     }
+    if sub_url:
+        # Low-res stream of the same camera for preview/scan (recording uses url)
+        new_camera['sub_url'] = sub_url
     cameras.append(new_camera)
     
     # Save
@@ -618,6 +660,12 @@ def api_cameras_update(camera_id):
             if cam.get('id') != camera_id and cam.get('url') == new_url:
                 return jsonify({'success': False, 'message': f'URL sudah terdaftar dengan nama: {cam.get("name")}'}), 400
         cameras[camera_idx]['url'] = new_url
+    if 'sub_url' in data:
+        sub_url = (data['sub_url'] or '').strip()
+        if sub_url:
+            cameras[camera_idx]['sub_url'] = sub_url
+        else:
+            cameras[camera_idx].pop('sub_url', None)
     if 'enabled' in data:
         cameras[camera_idx]['enabled'] = data['enabled']
     
@@ -678,13 +726,14 @@ def api_cameras_test():
         if str(url).isdigit():
             # Local camera test
             from app.services.camera_service import safe_hardware_lock
+            from app.services.local_capture import local_capture_backends
             try:
                 with safe_hardware_lock(url, timeout=10.0) as acquired:
                     if not acquired:
                         return jsonify({'success': False, 'message': 'Hardware sibuk (timeout 10s). Coba lagi.'})
                     
                     v_src = int(url)
-                    backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF]
+                    backends = [backend for _, backend in local_capture_backends()]
                         
                     success = False
                     for backend in backends:
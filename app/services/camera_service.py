@@ -6,35 +6,149 @@ camera discovery, status checking, and background monitoring.
 """
 
 import cv2
+import random
+import sys
 import threading
 import time
 import socket
 import select
 import re
 import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
 import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
 import platform
 import platform
 import numpy as np
+from collections import deque, namedtuple
+import config
 from app.utils.logger import video_logger
+from app.services.ffmpeg_capture import FFmpegCapture
+from app.services.mjpeg_capture import JPEGCapture, MJPEGCapture, is_mjpeg_candidate
+from app.services.local_capture import (
+    V4L2MJPEGCapture, local_capture_backends, open_local_capture,
+    list_video_devices, video_device_signature,
+)
+from app.services.capture_controller import capture_controller
 
 # [ANTIGRAVITY] GEVENT THREADPOOL
 # OpenCV calls are blocking C-functions that don't yield in Gevent.
 # We must run them in a real threadpool to keep the server responsive.
 import gevent
+import gevent.event
 from gevent.threadpool import ThreadPool
-from app.utils.safe_execution import safe_thread_loop
+from app.utils.safe_execution import safe_thread_loop, call_on_main_hub
 
-_gevent_pool = ThreadPool(20) # Dedicate 20 real threads for camera I/O
+
+# ============================================
+# CAPTURE THREAD SCHEDULER
+# ============================================
+
+class CapacityError(RuntimeError):
+    """The scheduler is full (camera limit reached or blocking-job queue full)"""
+
+
+class CaptureScheduler:
+    """
+    Real threads for camera work, in two separate pools:
+    - one dedicated capture thread per camera, up to max_cameras. Admission
+      control: the next camera is rejected with CapacityError, never queued.
+    - a small pool for short blocking OpenCV jobs (run_cv). Its queue is
+      bounded too, so a burst fails fast instead of waiting forever.
+    """
+    
+    def __init__(self, max_cameras=16, cv_threads=4, cv_queue_limit=16):
+        self.max_cameras = max_cameras
+        self.cv_threads = cv_threads
+        self.cv_queue_limit = cv_queue_limit
+        self.capture_pool = ThreadPool(max_cameras)
+        self.cv_pool = ThreadPool(cv_threads)
+        self.lock = threading.Lock()
+        self.captures = set()  # cameras holding a capture thread (until update() returns)
+        self.cv_pending = 0  # run_cv jobs queued or running
+        self.cv_running = 0
+        self.rejected_cameras = 0
+        self.rejected_jobs = 0
+    
+    def at_capacity(self):
+        with self.lock:
+            return len(self.captures) >= self.max_cameras
+    
+    def reserve(self, camera):
+        """Claim a capture thread for camera (call before acquiring any resources)"""
+        with self.lock:
+            if len(self.captures) >= self.max_cameras:
+                self.rejected_cameras += 1
+                raise CapacityError(f"Camera limit reached: {self.max_cameras} cameras already active (config max_cameras)")
+            self.captures.add(camera)
+    
+    def release(self, camera):
+        """Give back a reservation whose camera never started its capture thread"""
+        with self.lock:
+            self.captures.discard(camera)
+    
+    def start_capture(self, camera):
+        """
+        Run camera.update() on its reserved thread.
+        
+        Returns:
+            AsyncResult that is ready when the capture loop has exited
+        """
+        return self.capture_pool.spawn(self._run_capture, camera)
+    
+    def _run_capture(self, camera):
+        try:
+            camera.update()
+        finally:
+            with self.lock:
+                self.captures.discard(camera)
+    
+    def run_cv(self, func, args=(), kwargs=None):
+        """Run a short blocking call on the job pool and return its result"""
+        with self.lock:
+            if self.cv_pending >= self.cv_threads + self.cv_queue_limit:
+                self.rejected_jobs += 1
+                raise CapacityError(f"OpenCV job queue full ({self.cv_pending} pending, config cv_queue_limit)")
+            self.cv_pending += 1
+        try:
+            return self.cv_pool.apply(self._run_job, (func, args, kwargs or {}))
+        finally:
+            with self.lock:
+                self.cv_pending -= 1
+    
+    def _run_job(self, func, args, kwargs):
+        with self.lock:
+            self.cv_running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.cv_running -= 1
+    
+    def get_stats(self):
+        """Occupancy of both pools and how often admission control said no"""
+        with self.lock:
+            return {
+                'capture_threads': len(self.captures),
+                'max_cameras': self.max_cameras,
+                'rejected_cameras': self.rejected_cameras,
+                'cv_threads': self.cv_threads,
+                'cv_busy': self.cv_running,
+                'cv_queued': max(0, self.cv_pending - self.cv_running),
+                'cv_queue_limit': self.cv_queue_limit,
+                'rejected_jobs': self.rejected_jobs,
+            }
+
+
+capture_scheduler = CaptureScheduler(config.MAX_CAMERAS, config.CV_POOL_SIZE, config.CV_QUEUE_LIMIT)
 
 def run_cv(func, *args, **kwargs):
     """
-    Helper to run blocking OpenCV functions in the threadpool.
-    Accepts specific args and kwargs.
+    Helper to run blocking OpenCV functions in the job pool.
+    Accepts specific args and kwargs. Raises CapacityError when the queue is full.
     """
-    return _gevent_pool.apply(func, args, kwargs)
+    return capture_scheduler.run_cv(func, args, kwargs)
 
 
 
@@ -45,18 +159,43 @@ def run_cv(func, *args, **kwargs):
 # Per-index locks for local cameras
 index_locks = {i: threading.Lock() for i in range(32)}
 global_hardware_lock = threading.Lock()
+# Per-device locks for IP cameras (host:port), created on first use
+device_locks = {}
+device_locks_guard = threading.Lock()
+
+DEFAULT_PORTS = {'rtsp': 554, 'rtsps': 322, 'http': 80, 'https': 443}
+
+def device_key(url):
+    """
+    Hardware lock key of a camera: the index for local cameras, host:port for
+    IP cameras (a camera's main and sub-stream share one device), else the URL.
+    """
+    url = str(url)
+    if url.isdigit():
+        return int(url)
+    try:
+        parts = urlsplit(url)
+        if parts.hostname:
+            return f"{parts.hostname}:{parts.port or DEFAULT_PORTS.get(parts.scheme.lower(), 0)}"
+    except ValueError:
+        pass
+    return url
 
 @contextmanager
 def safe_hardware_lock(url, timeout=5.0):
     """
     Acquire a lock based on the camera URL/index.
-    If it's a local camera (digit), use the specific index lock.
+    If it's a local camera (digit), use the specific index lock;
+    IP cameras lock their own device (host:port), never each other.
     """
     lock_to_use = global_hardware_lock
-    if str(url).isdigit():
-        idx = int(url)
-        if idx in index_locks:
-            lock_to_use = index_locks[idx]
+    key = device_key(url)
+    if isinstance(key, int):
+        if key in index_locks:
+            lock_to_use = index_locks[key]
+    else:
+        with device_locks_guard:
+            lock_to_use = device_locks.setdefault(key, threading.Lock())
             
     acquired = lock_to_use.acquire(timeout=timeout)
     try:
@@ -66,10 +205,606 @@ def safe_hardware_lock(url, timeout=5.0):
             lock_to_use.release()
 
 
+# ============================================
+# JPEG ENCODER
+# ============================================
+
+# Optional libjpeg-turbo binding (pip install PyTurboJPEG; needs the libjpeg-turbo library)
+try:
+    from turbojpeg import TurboJPEG, TJSAMP_420, TJSAMP_422, TJSAMP_444, TJFLAG_FASTDCT
+except ImportError:
+    TurboJPEG = None
+
+JPEG_SUBSAMPLING = ('420', '422', '444')
+
+
+class OpenCVJpegEncoder:
+    """cv2.imencode (always available). No fast-DCT switch in OpenCV."""
+    
+    name = 'opencv'
+    
+    _SAMPLING = {
+        '420': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+        '422': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+        '444': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+    }
+    
+    def __init__(self, subsampling='420'):
+        self.subsampling = subsampling
+        self.fast_dct = False
+        self.params = [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, self._SAMPLING[subsampling]]
+    
+    def encode(self, image, quality):
+        """JPEG bytes of a BGR image, None on failure"""
+        ret, buf = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)] + self.params)
+        return buf.tobytes() if ret else None
+
+
+class TurboJpegEncoder:
+    """libjpeg-turbo via PyTurboJPEG: SIMD encode, optional fast (less exact) DCT"""
+    
+    name = 'turbojpeg'
+    
+    def __init__(self, subsampling='420', fast_dct=True):
+        self.jpeg = TurboJPEG()  # raises when the shared library is missing
+        self.subsampling = subsampling
+        self.fast_dct = fast_dct
+        self.sampling = {'420': TJSAMP_420, '422': TJSAMP_422, '444': TJSAMP_444}[subsampling]
+        self.flags = TJFLAG_FASTDCT if fast_dct else 0
+    
+    def encode(self, image, quality):
+        """JPEG bytes of a BGR image, None on failure"""
+        if not image.flags['C_CONTIGUOUS']:
+            image = np.ascontiguousarray(image)
+        return self.jpeg.encode(image, quality=int(quality), jpeg_subsample=self.sampling, flags=self.flags)
+
+
+def create_jpeg_encoder(backend='auto', subsampling='420', fast_dct=True):
+    """
+    Build a JPEG encoder.
+    
+    Args:
+        backend: 'turbojpeg', 'opencv' or 'auto' (turbojpeg when installed)
+        subsampling: chroma subsampling '420', '422' or '444'
+        fast_dct: use libjpeg-turbo's fast integer DCT (turbojpeg only)
+    
+    Falls back to OpenCV when libjpeg-turbo is not available.
+    """
+    if subsampling not in JPEG_SUBSAMPLING:
+        subsampling = '420'
+    if backend in ('auto', 'turbojpeg'):
+        if TurboJPEG is not None:
+            try:
+                return TurboJpegEncoder(subsampling, fast_dct)
+            except Exception as e:
+                print(f"[JPEG] libjpeg-turbo unavailable ({e}), using OpenCV")
+        elif backend == 'turbojpeg':
+            print("[JPEG] PyTurboJPEG not installed, using OpenCV")
+    return OpenCVJpegEncoder(subsampling)
+
+
+# Shared by all cameras (encoders are stateless per call and thread-safe)
+jpeg_encoder = create_jpeg_encoder(config.JPEG_ENCODER, config.JPEG_SUBSAMPLING, config.JPEG_FAST_DCT)
+
+
+# ============================================
+# JPEG RENDITIONS
+# ============================================
+
+# width: max output width in px (0 = native), quality: JPEG quality,
+# zoom: digital zoom (None = follow the camera's zoom_level)
+Rendition = namedtuple('Rendition', ['width', 'quality', 'zoom'])
+
+RENDITION_PRESETS = {
+    'preview': Rendition(640, 60, None),  # Downscale & Low Quality (Fastest)
+    'scan': Rendition(640, 50, None),     # Medium Resolution for visual, High FPS
+    'record': Rendition(0, 70, None),     # High Quality Preview
+}
+
+
+def parse_rendition(args, processing_mode=None):
+    """
+    Build a Rendition from request query args.
+    
+    Accepts ?rendition=<preset> and/or explicit ?w=&q=&zoom= overrides.
+    Falls back to the legacy ?type=scan mode, then to 'preview'.
+    """
+    preset = args.get('rendition') or ('scan' if processing_mode == 'scan' else 'preview')
+    base = RENDITION_PRESETS.get(preset, RENDITION_PRESETS['preview'])
+    
+    try:
+        width = int(args.get('w', base.width))
+        quality = int(args.get('q', base.quality))
+        zoom = args.get('zoom')
+        zoom = float(zoom) if zoom not in (None, '') else base.zoom
+    except (TypeError, ValueError):
+        return base
+    
+    width = max(0, min(3840, width))
+    quality = max(10, min(95, quality))
+    if zoom is not None:
+        zoom = max(1.0, min(4.0, zoom))
+    return Rendition(width, quality, zoom)
+
+
+# ============================================
+# FRAME BROADCAST HUB
+# ============================================
+
+class FrameSubscription:
+    """
+    One viewer's bounded JPEG queue for a single rendition.
+    When the client is slower than the camera the oldest frame is dropped.
+    """
+    
+    def __init__(self, hub, loop_key, rendition, maxlen=2):
+        self.hub = hub
+        self.loop_key = loop_key
+        self.rendition = rendition
+        self.queue = deque(maxlen=maxlen)  # (jpeg, capture timestamp)
+        self.event = gevent.event.Event()
+        self.last_seq = -1
+        self.dropped = 0
+        self.delivered = 0
+        self.lag = 0.0  # capture -> hand-off delay of the last frame (seconds)
+    
+    def push(self, jpeg, timestamp=None):
+        """Called on the subscriber's own event loop by the hub"""
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append((jpeg, timestamp))
+        self.event.set()
+    
+    def get(self, timeout=None):
+        """Wait (cooperatively) for the next frame. Returns None on timeout."""
+        if not self.queue:
+            self.event.clear()
+            self.event.wait(timeout)
+        if self.queue:
+            jpeg, timestamp = self.queue.popleft()
+            self.delivered += 1
+            if timestamp:
+                self.lag = time.time() - timestamp
+            return jpeg
+        return None
+    
+    def stats(self):
+        return {
+            'rendition': self.rendition._asdict(),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'lag_ms': round(self.lag * 1000, 1),
+        }
+    
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class FrameHub:
+    """
+    Per-camera fan-out of pre-encoded JPEG renditions.
+    The capture thread publishes; each event loop that has viewers owns an
+    async watcher, so subscribers wake only when a new frame exists.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Latest frame per rendition, replaced as a whole on every publish
+        self.latest = {}
+        self.latest_ts = None
+        self.seq = 0
+        # event loop key -> (async watcher, set of subscriptions)
+        self._loops = {}
+    
+    @property
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subs) for _, subs in self._loops.values())
+    
+    def active_renditions(self):
+        """Renditions that currently have at least one subscriber"""
+        with self.lock:
+            return {sub.rendition for _, subs in self._loops.values() for sub in subs}
+    
+    def subscriber_stats(self):
+        """Per-viewer delivery stats (for telemetry)"""
+        with self.lock:
+            subs = [sub for _, subs in self._loops.values() for sub in subs]
+        return [sub.stats() for sub in subs]
+    
+    def rendition_counts(self):
+        """Subscriber count per rendition (for status/metrics)"""
+        counts = {}
+        with self.lock:
+            for _, subs in self._loops.values():
+                for sub in subs:
+                    counts[sub.rendition] = counts.get(sub.rendition, 0) + 1
+        return counts
+    
+    def subscribe(self, rendition=None, maxlen=2):
+        """Register a viewer on the calling greenlet's event loop"""
+        rendition = rendition or RENDITION_PRESETS['preview']
+        hub = gevent.get_hub()
+        loop_key = id(hub)
+        sub = FrameSubscription(self, loop_key, rendition, maxlen=maxlen)
+        
+        with self.lock:
+            if loop_key not in self._loops:
+                watcher = hub.loop.async_()
+                watcher.start(self._deliver, loop_key)
+                self._loops[loop_key] = (watcher, set())
+            self._loops[loop_key][1].add(sub)
+        
+        # New viewers get the current frame straight away
+        jpeg = self.latest.get(rendition)
+        if jpeg is not None:
+            sub.last_seq = self.seq
+            sub.push(jpeg, self.latest_ts)
+        return sub
+    
+    def unsubscribe(self, sub):
+        with self.lock:
+            entry = self._loops.get(sub.loop_key)
+            if not entry:
+                return
+            watcher, subs = entry
+            subs.discard(sub)
+            if not subs:
+                del self._loops[sub.loop_key]
+                watcher.stop()
+                watcher.close()
+    
+    def publish(self, renditions, timestamp=None):
+        """
+        Called from the capture thread once per frame (thread-safe).
+        
+        Args:
+            renditions: dict of Rendition -> JPEG bytes for this frame
+            timestamp: Capture time of the frame (for viewer lag)
+        """
+        self.latest = renditions
+        self.latest_ts = timestamp
+        self.seq += 1
+        # send() under the lock: unsubscribe() closes watchers under it, and a
+        # send on a closed watcher raises (libuv) inside the capture thread
+        with self.lock:
+            for watcher, _ in self._loops.values():
+                watcher.send()
+    
+    def clear(self):
+        """Forget cached frames (nobody is watching)"""
+        self.latest = {}
+    
+    def _deliver(self, loop_key):
+        """Runs on the subscribers' event loop; coalesces bursts to the latest frame"""
+        latest, timestamp, seq = self.latest, self.latest_ts, self.seq
+        with self.lock:
+            entry = self._loops.get(loop_key)
+            subs = list(entry[1]) if entry else []
+        for sub in subs:
+            jpeg = latest.get(sub.rendition)
+            if jpeg is not None and sub.last_seq != seq:
+                sub.last_seq = seq
+                sub.push(jpeg, timestamp)
+
+
+# ============================================
+# NEW-FRAME SIGNAL
+# ============================================
+
+class FrameSignal:
+    """
+    "A new frame exists" notification for the capture thread's consumers.
+    Works for greenlets on the main hub and for real threadpool threads alike:
+    every event loop that has a waiter owns one async watcher, so notify()
+    (called from any thread) wakes exactly the loops that are waiting.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # event loop key -> (async watcher, set of waiter events)
+        self._loops = {}
+    
+    def notify(self):
+        """Wake every waiter (thread-safe, cheap when nobody waits)"""
+        # Under the lock wait_until() closes watchers under (see FrameHub.publish)
+        with self.lock:
+            for watcher, _ in self._loops.values():
+                watcher.send()
+    
+    def wait_until(self, predicate, timeout=None):
+        """
+        Block the calling greenlet/thread until predicate() is true.
+        
+        Returns:
+            bool: predicate() result (False on timeout)
+        """
+        if predicate():
+            return True
+        
+        hub = gevent.get_hub()
+        loop_key = id(hub)
+        event = gevent.event.Event()
+        with self.lock:
+            if loop_key not in self._loops:
+                watcher = hub.loop.async_()
+                watcher.start(self._wake, loop_key)
+                self._loops[loop_key] = (watcher, set())
+            self._loops[loop_key][1].add(event)
+        
+        deadline = None if timeout is None else time.time() + timeout
+        try:
+            # Re-check after registering so a notify() in between is never lost
+            while not predicate():
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                event.clear()
+                if predicate():
+                    break
+                event.wait(remaining)
+            return True
+        finally:
+            with self.lock:
+                entry = self._loops.get(loop_key)
+                if entry:
+                    watcher, events = entry
+                    events.discard(event)
+                    if not events:
+                        del self._loops[loop_key]
+                        watcher.stop()
+                        watcher.close()
+    
+    def _wake(self, loop_key):
+        """Runs on the waiters' own event loop"""
+        with self.lock:
+            entry = self._loops.get(loop_key)
+            events = list(entry[1]) if entry else []
+        for event in events:
+            event.set()
+
+
+# ============================================
+# RECENT FRAME RING BUFFER
+# ============================================
+
+FRAME_RING_CAPACITY = 8  # ~270 ms at 30 FPS of slack for slow consumers
+
+class FrameRing:
+    """
+    Fixed-capacity ring of the most recent raw frames.
+    Every frame gets a monotonically increasing sequence number (starting at 1)
+    and its capture timestamp, so each consumer can read at its own pace with
+    frames_since() and knows exactly how many frames it missed.
+    """
+    
+    def __init__(self, capacity=FRAME_RING_CAPACITY):
+        self.capacity = capacity
+        self.slots = [None] * capacity  # (seq, timestamp, frame)
+        self.seq = 0
+        self.lock = threading.Lock()
+        self.signal = FrameSignal()
+        # consumer name -> {'seq', 'missed', 'last_read'} (for telemetry)
+        self.consumers = {}
+    
+    def push(self, frame, timestamp):
+        """Store a new frame (capture thread) and wake waiters. Returns its sequence number."""
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            self.slots[seq % self.capacity] = (seq, timestamp, frame)
+        self.signal.notify()
+        return seq
+    
+    def wait(self, seq, timeout=None):
+        """Block until a frame newer than seq exists. Returns False on timeout."""
+        return self.signal.wait_until(lambda: self.seq > seq, timeout)
+    
+    def latest(self):
+        """Newest (seq, timestamp, frame) or None"""
+        with self.lock:
+            if self.seq == 0:
+                return None
+            return self.slots[self.seq % self.capacity]
+    
+    def frames_since(self, seq, consumer=None):
+        """
+        Frames newer than seq, oldest first (references, not copies).
+        
+        Args:
+            seq: Last sequence number the consumer has seen (use ring.seq to start "from now")
+            consumer: Optional name to track this reader's lag/missed frames
+        
+        Returns:
+            Tuple of (list of (seq, timestamp, frame), number of frames missed)
+        """
+        with self.lock:
+            newest = self.seq
+            if newest <= seq:
+                frames, missed = [], 0
+            else:
+                oldest = max(seq + 1, newest - self.capacity + 1)
+                frames = [self.slots[i % self.capacity] for i in range(oldest, newest + 1)]
+                missed = oldest - (seq + 1)
+            if consumer is not None:
+                info = self.consumers.setdefault(consumer, {'seq': seq, 'missed': 0, 'last_read': 0})
+                info['seq'] = newest if frames else max(seq, info['seq'])
+                info['missed'] += missed
+                info['last_read'] = time.time()
+        return frames, missed
+    
+    def forget(self, consumer):
+        """Drop a named reader that is done (instead of waiting for it to go stale)"""
+        with self.lock:
+            self.consumers.pop(consumer, None)
+    
+    def consumer_stats(self, stale_after=5.0):
+        """Lag of named readers (frames behind, missed); forgets readers idle for stale_after"""
+        now = time.time()
+        stats = []
+        with self.lock:
+            for name, info in list(self.consumers.items()):
+                if now - info['last_read'] > stale_after:
+                    del self.consumers[name]
+                    continue
+                behind = self.seq - info['seq']
+                lag = 0.0
+                if behind > 0:
+                    # Age of the oldest frame this reader has not taken yet
+                    next_seq = max(info['seq'] + 1, self.seq - self.capacity + 1)
+                    lag = now - self.slots[next_seq % self.capacity][1]
+                stats.append({
+                    'consumer': name,
+                    'behind_frames': behind,
+                    'missed': info['missed'],
+                    'lag_ms': round(lag * 1000, 1),
+                })
+        return stats
+
+
+# ============================================
+# FRAME BUFFER POOL
+# ============================================
+
+# Upper bound per camera: ring + last_frame + frames held by slow consumers
+FRAME_POOL_MAX = FRAME_RING_CAPACITY * 3
+
+class FramePool:
+    """
+    Preallocated frame buffers the capture loop decodes into.
+    
+    A buffer is handed out again only when nothing else references it
+    (ring slot, last_frame, a recorder's batch or a crop view of it), so
+    published frames are never overwritten. When every buffer is busy a new
+    one is allocated and kept, up to FRAME_POOL_MAX.
+    """
+    
+    def __init__(self, max_buffers=FRAME_POOL_MAX):
+        self.max_buffers = max_buffers
+        self.buffers = []
+        self.shape = None
+        self.next_index = 0
+        self.allocations = 0  # buffers allocated since start (flat once warmed up)
+    
+    def acquire(self, shape):
+        """A writable buffer of the given shape that no consumer holds"""
+        if shape != self.shape:
+            # Capture size changed: old buffers are dropped as consumers let go
+            self.buffers = []
+            self.shape = shape
+            self.next_index = 0
+        
+        count = len(self.buffers)
+        for i in range(count):
+            index = (self.next_index + i) % count
+            # References: the list + getrefcount's argument. Anything more is a consumer.
+            if sys.getrefcount(self.buffers[index]) <= 2:
+                self.next_index = (index + 1) % count
+                buf = self.buffers[index]
+                buf.flags.writeable = True
+                return buf
+        
+        buf = np.empty(shape, dtype=np.uint8)
+        self.allocations += 1
+        if count < self.max_buffers:
+            self.buffers.append(buf)
+        return buf
+
+
+# ============================================
+# CAPTURE TELEMETRY
+# ============================================
+
+STATS_WINDOW = 120  # samples per rolling window (~4 s at 30 FPS)
+
+def _summarize(values, scale=1.0):
+    """avg/p95/max of a rolling window (None when empty)"""
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        'avg': round(sum(values) / len(values) * scale, 2),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))] * scale, 2),
+        'max': round(values[-1] * scale, 2),
+    }
+
+
+class CaptureStats:
+    """
+    Rolling statistics of one camera's capture loop.
+    Written only by the capture thread; snapshot() may run anywhere.
+    """
+    
+    def __init__(self, window=STATS_WINDOW):
+        self.frame_times = deque(maxlen=window)
+        self.read_seconds = deque(maxlen=window)
+        self.encode_seconds = deque(maxlen=window)
+        self.jpeg_bytes = deque(maxlen=window)
+        self.frames = 0
+        self.read_failures = 0
+        self.duplicates = 0
+        self.encoded_frames = 0
+        self._last_pts = None
+    
+    def record_read(self, seconds, ok, timestamp=None, pts=None):
+        """
+        One cap.read() call.
+        pts is the source timestamp when the backend reports one; a frame whose
+        pts did not advance is a repeated (duplicated) source frame.
+        """
+        self.read_seconds.append(seconds)
+        if not ok:
+            self.read_failures += 1
+            return
+        self.frames += 1
+        self.frame_times.append(timestamp)
+        if pts and pts > 0:
+            if self._last_pts is not None and pts == self._last_pts:
+                self.duplicates += 1
+            self._last_pts = pts
+    
+    def record_encode(self, seconds, jpegs):
+        """Zoom/resize + JPEG encode of all renditions for one frame"""
+        self.encode_seconds.append(seconds)
+        self.encoded_frames += 1
+        for jpeg in jpegs:
+            self.jpeg_bytes.append(len(jpeg))
+    
+    def snapshot(self):
+        times = list(self.frame_times)
+        fps = 0.0
+        if len(times) > 1 and times[-1] > times[0]:
+            fps = (len(times) - 1) / (times[-1] - times[0])
+        jpeg_sizes = list(self.jpeg_bytes)
+        return {
+            'fps': round(fps, 1),
+            'frames': self.frames,
+            'read_failures': self.read_failures,
+            'duplicates': self.duplicates,
+            'read_ms': _summarize(self.read_seconds, 1000),
+            'encode_ms': _summarize(self.encode_seconds, 1000),
+            'encoded_frames': self.encoded_frames,
+            'jpeg_bytes_avg': int(sum(jpeg_sizes) / len(jpeg_sizes)) if jpeg_sizes else 0,
+        }
+
+
 # ============================================
 # VIDEO CAMERA CLASS
 # ============================================
 
+ADAPT_INTERVAL = 1.0        # seconds between capture profile re-evaluations
+
+# In-place reconnect: the first failed read puts the camera in 'reconnecting' (so the
+# registry keeps it, see _is_camera_healthy); after this many failed reads in a row
+# (~2 s, well inside the 5 s staleness window) the capture is reopened,
+# waiting RECONNECT_BASE_DELAY doubling up to RECONNECT_MAX_DELAY (jittered) between
+# attempts; an unused camera that stays down RECONNECT_GIVE_UP seconds is stopped
+RECONNECT_AFTER_ERRORS = 20
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+RECONNECT_GIVE_UP = 300.0
+SCAN_DEMAND_SECONDS = 3.0   # a get_scan_frame() call keeps the camera in scan profile this long
+
 class VideoCamera:
     """
     Threaded camera streaming class with hardware management
@@ -77,54 +812,96 @@ class VideoCamera:
     
     def __init__(self, url):
         self.url = url
-        self.last_frame = None
-        # [ANTIGRAVITY] DOUBLE BUFFERING
-        # self.last_jpeg: Stores the latest PRE-ENCODED Jpeg for streaming (Preview)
-        # self.last_frame: Stores the latest RAW frame for recording/barcode (Processing)
-        self.last_jpeg = None
-        self.lock = threading.Lock()
-        self.running = True
-        self.last_access = time.time()
-        self.last_update = time.time()
-        self.consecutive_errors = 0
-        self.zoom_level = 1.0  # 1.0 = no zoom, 2.0 = 2x zoom
-        self.last_heartbeat = time.time()  # Initialize heartbeat
-        
-        self.zoom_level = 1.0  # 1.0 = no zoom, 2.0 = 2x zoom
-        self.last_heartbeat = time.time()  # Initialize heartbeat
-        self.start_time = time.time() # [ANTIGRAVITY] Track creation time for grace period
-        
-        # Adaptive FPS for CPU optimization
-        self.usage_mode = 'preview'  # 'preview', 'scan', 'record'
-        self.target_fps = 30  # Default to 30 FPS for responsiveness
-        
-        # Determine backend
-        is_local = str(url).isdigit()
-        
-        if is_local:
-            # Try DirectShow first, fallback to MSMF
-            # [ANTIGRAVITY] MOVED TO UPDATE() for Thread Affinity
-            self.cap = None 
-        else:
-            # IP camera
-            self.cap = None
+        self.running = False
+        # Admission control first: a rejected camera must not open anything
+        capture_scheduler.reserve(self)
+        try:
+            self.last_frame = None
+            # [ANTIGRAVITY] DOUBLE BUFFERING
+            # self.last_jpeg: Stores the latest PRE-ENCODED Jpeg for streaming (Preview)
+            # self.last_frame: Stores the latest RAW frame for recording/barcode (Processing, read-only, shared by reference)
+            self.last_jpeg = None
+            self.hub = FrameHub()  # Fan-out of last_jpeg to MJPEG viewers
+            self.frames = FrameRing()  # Recent raw frames with sequence numbers
+            self.stats = CaptureStats()  # Rolling capture/encode telemetry
+            self.pool = FramePool()  # Decode targets, reused once consumers let go
+            self.scratch = {}  # Capture-thread-only resize targets, by rendition size
+            self.geometry = {}  # (h, w, zoom, width) -> crop ROI, output size, interpolation
+            self.lock = threading.Lock()
+            self.running = True
+            self.last_access = time.time()
+            self.last_update = time.time()
+            self.consecutive_errors = 0
+            self.zoom_level = 1.0  # 1.0 = no zoom, 2.0 = 2x zoom
+            self.last_heartbeat = time.time()  # Initialize heartbeat
+        
+            self.zoom_level = 1.0  # 1.0 = no zoom, 2.0 = 2x zoom
+            self.last_heartbeat = time.time()  # Initialize heartbeat
+            self.start_time = time.time() # [ANTIGRAVITY] Track creation time for grace period
+        
+            # Adaptive FPS/resolution for CPU optimization (see capture_controller)
+            self.usage_mode = 'preview'  # 'preview', 'scan', 'record'
+            self.target_fps = config.VIDEO_FPS
+            self.capture_size = (config.VIDEO_WIDTH, config.VIDEO_HEIGHT)
+            self.demand = 'preview'
+            self.last_scan_request = 0
+            self.next_adapt = 0
+            self.prewarmed = False  # Opened by the warm pool and not used yet
+            self.sub_stream_hint_shown = False  # see adapt()
+            self.first_frame_at = None  # Cold-start measurement (see bring_up_cameras)
+            # MJPEG passthrough: newest source JPEG not decoded yet (last_frame is older)
+            self.pending_jpeg = None
+            self.passthrough_frames = 0
+            self.lazy_decodes = 0
+        
+            # Lifecycle + in-place reconnect metrics
+            self.state = 'starting'  # 'starting', 'live', 'reconnecting', 'stopping', 'stopped'
+            self.down_since = None
+            self.downtime_total = 0.0
+            self.reconnect_attempts = 0
+            self.reconnects = 0
+        
+            # Determine backend
+            is_local = str(url).isdigit()
+        
+            if is_local:
+                # Try DirectShow first, fallback to MSMF
+                # [ANTIGRAVITY] MOVED TO UPDATE() for Thread Affinity
+                self.cap = None 
+            else:
+                # IP camera
+                self.cap = None
 
         
-        # [ANTIGRAVITY] MOVED PROPERTY SETTING TO UPDATE()
-        # if self.cap.isOpened():
-        #    ...
+            # [ANTIGRAVITY] MOVED PROPERTY SETTING TO UPDATE()
+            # if self.cap.isOpened():
+            #    ...
+        
+            # PROCESS MODE: capture/decode in a child process, frames via shared memory.
+            # Spawned on the main hub (we may be on a recorder thread); update() only waits for it.
+            self.capture_process = None
+            if config.CAPTURE_MODE == 'process':
+                from app.services.capture_process import CaptureProcess
+                self.capture_process = call_on_main_hub(lambda: CaptureProcess(url))
             
-        print(f"[Camera] {url} init pending (background thread)...")
+            print(f"[Camera] {url} init pending (background thread)...")
         
-        # [ANTIGRAVITY] THREAD AFFINITY FIX
-        # Instead of a Greenlet (threading.Thread patched), we use a REAL WORKER THREAD
-        # from the threadpool to host the entire camera loop. 
-        # This ensures init and read happen in the SAME real thread.
-        self.running = True
+            # [ANTIGRAVITY] THREAD AFFINITY FIX
+            # Instead of a Greenlet (threading.Thread patched), we use a REAL WORKER THREAD
+            # (this camera's dedicated capture thread) to host the entire camera loop.
+            # This ensures init and read happen in the SAME real thread.
+            self.running = True
         
-        # [ANTIGRAVITY] STORE RESULT FOR JOINING
-        # We store the AsyncResult to allow 'joining' (waiting) later.
-        self.worker_task = _gevent_pool.apply_async(self.update)
+            # [ANTIGRAVITY] STORE RESULT FOR JOINING
+            # We store the AsyncResult to allow 'joining' (waiting) later.
+            self.worker_task = capture_scheduler.start_capture(self)
+        except Exception:
+            # Give the capture thread slot back, or the camera limit leaks
+            self.running = False
+            capture_scheduler.release(self)
+            if getattr(self, 'capture_process', None):
+                self.capture_process.release()
+            raise
 
     
     def __del__(self):
@@ -134,6 +911,12 @@ class VideoCamera:
         """Explicitly stop the camera stream and FORCE hardware release"""
         print(f"[Camera] Stopping {self.url}...")
         self.running = False
+        if getattr(self, 'state', 'stopped') != 'stopped':
+            self.state = 'stopping'
+        
+        # Ask the capture child to exit; its closing pipe unblocks our worker's read()
+        if getattr(self, 'capture_process', None):
+            self.capture_process.request_stop()
 
         # [ANTIGRAVITY] PROPER JOINING
         # Use the stored AsyncResult from the threadpool
@@ -160,21 +943,247 @@ class VideoCamera:
     
     def set_usage_mode(self, mode):
         """
-        Set camera usage mode to adjust performance
+        Set camera usage mode to adjust capture performance.
+        JPEG size/quality is chosen per viewer (see Rendition), not here.
         
         Args:
             mode: 'preview', 'scan', or 'record'
         """
         self.usage_mode = mode
+        self.adapt()
+        print(f"[Camera {self.url}] Mode: {mode}, Target FPS: {self.target_fps}")
+    
+    def current_demand(self):
+        """
+        What the camera is needed for right now, highest first:
+        'record' (a recorder reads the frame ring), 'scan' (scanner page or
+        recent get_scan_frame), 'preview' (MJPEG viewers only), 'idle', or
+        'warm' (pre-connected by the warm pool, never used).
+        """
+        if any(c['consumer'].startswith('recorder:') for c in self.frames.consumer_stats()):
+            return 'record'
+        renditions = self.hub.active_renditions()
+        if renditions and self.usage_mode in ('record', 'scan'):
+            return self.usage_mode
+        if RENDITION_PRESETS['scan'] in renditions or time.time() - self.last_scan_request < SCAN_DEMAND_SECONDS:
+            return 'scan'
+        if renditions:
+            return 'preview'
+        return 'warm' if self.prewarmed else 'idle'
+    
+    def adapt(self):
+        """
+        Pick the capture profile for the current demand and CPU pressure.
+        Safe from any thread: fps applies to the next frame, a size change is
+        applied by the capture thread (see _apply_capture_profile).
+        """
+        demand = self.current_demand()
+        fps, width, height = capture_controller.profile_for(demand)
+        if (demand, fps) != (self.demand, self.target_fps):
+            print(f"[Camera {self.url}] Demand: {demand}, Target: {fps} FPS @ {width}x{height}")
+        if (demand in ('idle', 'warm') and not self.sub_stream_hint_shown and not str(self.url).isdigit()
+                and live_stream_url(self.url) == self.url == recording_stream_url(self.url)):
+            # IP streams are still decoded at the source rate (see the drain in update())
+            self.sub_stream_hint_shown = True
+            print(f"[Camera {self.url}] Idle at {fps} FPS but still decoding every source frame; "
+                  f"declare a sub_url in camera_list to idle on the low-resolution stream")
+        self.demand = demand
+        self.target_fps = fps
+        self.capture_size = (width, height)
+        self.next_adapt = time.time() + ADAPT_INTERVAL
+    
+    def _apply_capture_profile(self, applied):
+        """
+        Push target fps/size to the capture backend when they changed.
+        Only local devices can change size mid-stream; IP streams keep their
+        native size (use a sub-stream for light previews) and ffmpeg/process
+        captures have a fixed frame buffer size.
         
-        if mode == 'preview':
-            self.target_fps = 30  # High FPS for preview (Same as scan)
-        elif mode == 'scan':
-            self.target_fps = 30# Medium-High FPS for scanning (Increased for dual-camera responsiveness)
-        elif mode == 'record':
-            self.target_fps = 30  # High FPS for recording (Smooth)
+        Returns:
+            The (fps, size) now applied
+        """
+        wanted = (self.target_fps, self.capture_size)
+        if wanted == applied:
+            return applied
+        try:
+            if wanted[0] != applied[0]:
+                # Process mode: the child throttles its own decode rate
+                self.cap.set(cv2.CAP_PROP_FPS, wanted[0])
+            resizable = isinstance(self.cap, (cv2.VideoCapture, V4L2MJPEGCapture))
+            if wanted[1] != applied[1] and str(self.url).isdigit() and resizable:
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, wanted[1][0])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, wanted[1][1])
+        except Exception as e:
+            print(f"[Camera] {self.url} Profile change error: {e}")
+        return wanted
+    
+    def _open_capture(self, is_local, use_ffmpeg):
+        """
+        One attempt to open and validate the capture (runs in the worker thread).
         
-        print(f"[Camera {self.url}] Mode: {mode}, Target FPS: {self.target_fps}")
+        Returns:
+            bool: True when self.cap is open and delivering frames
+        """
+        if self.capture_process is not None:
+            # PROCESS MODE: replace the exited child (spawned on the hub thread)
+            from app.services.capture_process import CaptureProcess
+            self.capture_process.release()
+            self.capture_process = call_on_main_hub(lambda: CaptureProcess(self.url))
+            if self.capture_process.wait_ready():
+                self.cap = self.capture_process
+                return True
+            return False
+        
+        try:
+            if is_local:
+                # [ANTIGRAVITY] FIX: Wrapped in safe_hardware_lock to prevent "Double Open" crash
+                with safe_hardware_lock(self.url, timeout=10.0) as acquired:
+                    if not acquired:
+                         print(f"[Camera] {self.url} Lock Timeout (Busy). Retrying...")
+                         return False
+                    
+                    if not self.running: return False
+
+                    # DSHOW then MSMF on Windows, V4L2 + MJPG on Linux
+                    for name, backend in local_capture_backends():
+                        self.cap = open_local_capture(
+                            int(self.url), backend, config.VIDEO_WIDTH, config.VIDEO_HEIGHT,
+                            config.VIDEO_FPS, passthrough=config.MJPEG_PASSTHROUGH,
+                        )
+                        if self.cap is not None:
+                            print(f"[Camera] {self.url} opened via {name}"
+                                  + (" (MJPEG passthrough)" if isinstance(self.cap, V4L2MJPEGCapture) else ""))
+                            break
+            else:
+                # Per-device lock: waits for a previous release of the same camera
+                # (single-client sources like DroidCam), never for other cameras
+                with safe_hardware_lock(self.url, timeout=10.0) as acquired:
+                    if not acquired:
+                         print(f"[Camera] {self.url} Lock Timeout (Busy). Retrying...")
+                         return False
+                    
+                    self.cap = None
+                    if config.MJPEG_PASSTHROUGH and is_mjpeg_candidate(self.url):
+                        self.cap = MJPEGCapture(self.url)
+                        if not self.cap.isOpened():
+                            self.cap = None  # Not a multipart MJPEG stream: decode it below
+                    
+                    if self.cap is not None:
+                        print(f"[Camera] {self.url} MJPEG passthrough")
+                    elif use_ffmpeg:
+                        self.cap = FFmpegCapture(
+                            self.url, config.VIDEO_WIDTH, config.VIDEO_HEIGHT,
+                            ffmpeg_path=config.FFMPEG_PATH,
+                            rtsp_transport=config.RTSP_TRANSPORT,
+                            buffers=1,  # the capture loop reads into its FramePool
+                        )
+                    else:
+                        self.cap = cv2.VideoCapture(self.url)
+                
+            if self.cap and self.cap.isOpened():
+                # Setup props
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.VIDEO_WIDTH)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.VIDEO_HEIGHT)
+                self.cap.set(cv2.CAP_PROP_FPS, config.VIDEO_FPS)
+                
+                # WARMUP / VALIDATION
+                # Read a few frames to ensure stream is actually flowing
+                # (ffmpeg only delivers complete decoded frames: one is enough)
+                # detailed validation inside lock
+                single_read = use_ffmpeg or isinstance(self.cap, MJPEGCapture)
+                warmup_reads, min_valid = (1, 1) if single_read else (10, 3)
+                valid_frames = 0
+                for _ in range(warmup_reads): 
+                    ret, test = self.cap.read()
+                    if ret and test is not None and test.size > 0:
+                        valid_frames += 1
+                    if warmup_reads > 1:
+                        time.sleep(0.05)
+                    
+                if valid_frames >= min_valid:
+                    return True
+                print(f"[Camera] {self.url} Opened but NO FRAMES (Warmup Failed). Resetting...")
+                self.cap.release()
+                self.cap = None
+            else:
+                print(f"[Camera] {self.url} Failed to open.")
+                
+        except Exception as e:
+            print(f"[Camera] {self.url} Init Error: {e}")
+        return False
+    
+    def _release_capture(self):
+        """Release self.cap (worker thread), holding the hardware lock like init does"""
+        if not self.cap:
+            return
+        # [ANTIGRAVITY] Clean Release with Hardware Lock
+        try:
+            # We should try to acquire lock for release too, strictly speaking,
+            # but typical pattern is: owning thread releases.
+            # However, to sync with the 'update' of the NEXT thread, we should hold it.
+            # But safe_hardware_lock might be held by US if we were in the 'with' block?
+            # No, we only hold it during INIT. 
+            
+            # So here we just release. The NEXT thread will wait on the lock.
+            # BUT we need to make sure we don't return until it's really gone.
+            
+            with safe_hardware_lock(self.url, timeout=5.0):
+                self.cap.release()
+                print(f"[Camera] {self.url} released (Worker Thread)")
+                
+            # [ANTIGRAVITY] COOLDOWN: Give Windows Drivers time to breathe
+            time.sleep(1.0) 
+        except Exception as e: 
+            print(f"[Camera] Release error: {e}")
+        
+        self.cap = None
+    
+    def _reconnect(self, is_local, use_ffmpeg):
+        """
+        Reopen a dropped capture in place with jittered exponential backoff.
+        The object, its MJPEG subscribers and frame ring consumers (recorders)
+        stay attached; they simply see no new frames while the camera is down.
+        
+        Returns:
+            bool: True once frames flow again, False when stopped or when the
+                  camera stayed down RECONNECT_GIVE_UP seconds with nobody using it
+        """
+        self.state = 'reconnecting'
+        if self.down_since is None:
+            self.down_since = time.time()
+        print(f"[Camera] {self.url} stream lost, reconnecting...")
+        self._release_capture()
+        
+        delay = RECONNECT_BASE_DELAY
+        while self.running:
+            downtime = time.time() - self.down_since
+            in_use = self.hub.subscriber_count > 0 or bool(self.frames.consumer_stats())
+            if downtime > RECONNECT_GIVE_UP and not in_use:
+                print(f"[Camera] {self.url} down for {downtime:.0f}s and unused. Giving up.")
+                return False
+            
+            # Equal jitter: cameras that dropped together do not retry in lockstep
+            wait = delay / 2 + random.uniform(0, delay / 2)
+            deadline = time.time() + wait
+            while self.running and time.time() < deadline:
+                time.sleep(0.2)
+            if not self.running:
+                return False
+            
+            self.reconnect_attempts += 1
+            print(f"[Camera] {self.url} Reconnect attempt {self.reconnect_attempts} (after {wait:.1f}s)...")
+            if self._open_capture(is_local, use_ffmpeg):
+                downtime = time.time() - self.down_since
+                self.downtime_total += downtime
+                self.down_since = None
+                self.reconnects += 1
+                self.consecutive_errors = 0
+                self.state = 'live'
+                print(f"[Camera] {self.url} RECONNECTED after {downtime:.1f}s")
+                return True
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+        return False
     
     def update(self):
         """Background thread to continuously read frames (RUNS IN REAL THREAD)"""
@@ -183,66 +1192,28 @@ class VideoCamera:
         # [ANTIGRAVITY] Initialize Capture INSIDE the Worker Thread
         print(f"[Camera] Initializing capture for {self.url} in worker thread...")
         is_local = str(self.url).isdigit()
+        use_ffmpeg = not is_local and config.CAPTURE_BACKEND == 'ffmpeg'
+        self.state = 'starting'
         
         # [ANTIGRAVITY] RETRY STRATEGY
         # Try to connect up to 3 times to simulate "flicker/retry" behavior for stubborn webcams.
         success_init = False
         
+        if self.capture_process is not None:
+            # PROCESS MODE: the child opens, retries and validates the camera itself
+            success_init = self.capture_process.wait_ready()
+            if success_init:
+                self.cap = self.capture_process
+                print(f"[Camera] {self.url} CONNECTED (capture process)")
+        
         for attempt in range(1, 4):
-            if not self.running: break
+            if not self.running or self.capture_process is not None: break
             print(f"[Camera] {self.url} Init Attempt {attempt}/3...")
             
-            try:
-                if is_local:
-                    # [ANTIGRAVITY] FIX: Wrapped in safe_hardware_lock to prevent "Double Open" crash
-                    with safe_hardware_lock(self.url, timeout=10.0) as acquired:
-                        if not acquired:
-                             print(f"[Camera] {self.url} Lock Timeout (Busy). Retrying...")
-                             time.sleep(1.0)
-                             continue
-                        
-                        if not self.running: return
-
-                        # Try DSHOW
-                        self.cap = cv2.VideoCapture(int(self.url), cv2.CAP_DSHOW)
-                        
-                        # If failed or not opened, try MSMF
-                        if not self.cap.isOpened():
-                             self.cap.release()
-                             self.cap = cv2.VideoCapture(int(self.url), cv2.CAP_MSMF)
-                else:
-                    self.cap = cv2.VideoCapture(self.url)
-                    
-                if self.cap and self.cap.isOpened():
-                    # Setup props
-                    self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                    self.cap.set(cv2.CAP_PROP_FPS, 30)
-                    
-                    # WARMUP / VALIDATION
-                    # Read a few frames to ensure stream is actually flowing
-                    # detailed validation inside lock
-                    valid_frames = 0
-                    for _ in range(10): 
-                        ret, test = self.cap.read()
-                        if ret and test is not None and test.size > 0:
-                            valid_frames += 1
-                        time.sleep(0.05)
-                        
-                    if valid_frames > 2:
-                        print(f"[Camera] {self.url} CONNECTED & STABLE (Attempt {attempt})")
-                        success_init = True
-                        break # Exit retry loop
-                    else:
-                         print(f"[Camera] {self.url} Opened but NO FRAMES (Warmup Failed). Resetting...")
-                         self.cap.release()
-                         self.cap = None
-                else:
-                    print(f"[Camera] {self.url} Failed to open.")
-                    
-            except Exception as e:
-                print(f"[Camera] {self.url} Init Error: {e}")
+            if self._open_capture(is_local, use_ffmpeg):
+                print(f"[Camera] {self.url} CONNECTED & STABLE (Attempt {attempt})")
+                success_init = True
+                break # Exit retry loop
             
             # If we are here, attempt failed. Wait before retry.
             # "Mati nyala" simulation
@@ -251,7 +1222,11 @@ class VideoCamera:
         if not success_init:
             print(f"[Camera] {self.url} FAILED all 3 attempts. Giving up.")
             self.running = False
+            self.state = 'stopped'
+            if self.capture_process is not None:
+                self.capture_process.release()
             return
+        self.state = 'live'
 
 
         # ----------------------------------------
@@ -259,126 +1234,264 @@ class VideoCamera:
         # ----------------------------------------
         last_error_emit = 0
         last_frame_time = 0
+        # Opened at full config size/fps; the first adapt() steps down if nobody needs it
+        applied_profile = (config.VIDEO_FPS, (config.VIDEO_WIDTH, config.VIDEO_HEIGHT))
+        # (the capture child throttles its own reads)
+        drain_while_throttled = not is_local and self.capture_process is None
+        grab_seconds = 0.0
+        frame_shape = None
         
         while self.running:
             if self.cap and self.cap.isOpened():
-                # FPS throttling
+                # Adaptive capture profile (demand + CPU pressure)
                 current_time = time.time()
+                if current_time >= self.next_adapt:
+                    self.adapt()
+                applied_profile = self._apply_capture_profile(applied_profile)
+                
+                # FPS throttling
                 frame_interval = 1.0 / self.target_fps
                 
-                if current_time - last_frame_time < frame_interval:
-                    time.sleep(0.01) # Standard sleep blocks this thread only
+                remaining = frame_interval - (current_time - last_frame_time)
+                if remaining > 0:
+                    # Network streams keep arriving at their own rate: drain them while
+                    # throttled so a lowered fps does not turn into growing latency.
+                    # Limitation: grab() still decodes (OpenCV's FFmpeg backend, and
+                    # ffmpeg in FFmpegCapture), so an IP camera stepped down to the
+                    # idle/warm fps saves only the conversion/encode work, not the
+                    # decode. Such cameras should idle on their sub-stream (sub_url).
+                    if drain_while_throttled and remaining > 1.5 * grab_seconds:
+                        grab_started = time.perf_counter()
+                        if self.cap.grab():
+                            # Rough source frame interval, so we stop draining in time
+                            grab_seconds = 0.8 * grab_seconds + 0.2 * (time.perf_counter() - grab_started)
+                            continue
+                    # Sleep once until the next frame is due (blocks this thread only)
+                    time.sleep(remaining)
                     continue
                 
+                # Demand-driven preview: only renditions somebody subscribes to are encoded
+                renditions = self.hub.active_renditions()
+                passthrough = isinstance(self.cap, JPEGCapture)
+                
                 # [ANTIGRAVITY] Direct Blocking Read (Safe in Worker Thread)
+                # Decode into a pooled buffer (process mode already hands out shared-memory views)
+                read_started = time.perf_counter()
+                pooled = frame_shape and self.capture_process is None and not passthrough
+                buf = self.pool.acquire(frame_shape) if pooled else None
                 try:
-                    ret, frame = self.cap.read()
+                    if passthrough:
+                        # Decode only for the recorder and renditions the source JPEG
+                        # cannot serve (scanners decode lazily, see _decode_pending)
+                        ret, frame = self.cap.grab(), None
+                        if ret and (frame_shape is None or self.demand == 'record'
+                                    or not self._passes_through(renditions, frame_shape)):
+                            ret, frame = self.cap.retrieve()
+                    else:
+                        ret, frame = self.cap.read(buf) if buf is not None else self.cap.read()
                 except Exception as e:
                     print(f"[{self.url}] Read error: {e}")
                     ret, frame = False, None
+                captured_at = time.time()
+                self.stats.record_read(
+                    time.perf_counter() - read_started, ret, captured_at,
+                    self.cap.get(cv2.CAP_PROP_POS_MSEC) if ret else None
+                )
                 
+                buf = None
                 if ret:
-                    # [ANTIGRAVITY] SEPARATION OF CONCERNS
-                    # raw_frame: UNTOUCHED full resolution (for Recording)
-                    # display_frame: Zoomed/Cropped (for Preview/Scanner)
-                    raw_frame = frame
-                    display_frame = frame
-
-                    # Apply zoom ONLY to display_frame
-                    if self.zoom_level > 1.0:
-                        h, w = frame.shape[:2]
-                        crop_w = int(w / self.zoom_level)
-                        crop_h = int(h / self.zoom_level)
-                        x = (w - crop_w) // 2
-                        y = (h - crop_h) // 2
-                        cropped = frame[y:y+crop_h, x:x+crop_w]
-                        try:
-                            display_frame = cv2.resize(cropped, (w, h))
-                        except Exception as e:
-                            print(f"Zoom error: {e}")
-                            display_frame = frame # Fallback
-
-                    # [ANTIGRAVITY] DECISION: PRE-ENCODE JPEG HERE (Worker Thread)
-                    encoded_jpeg = None
-                    try:
-                        # Adaptive quality/size based on usage mode (Using display_frame)
-                        if self.usage_mode == 'preview':
-                            # Preview: Downscale & Low Quality (Fastest)
-                             h, w = display_frame.shape[:2]
-                             if w > 0 and h > 0:
-                                preview_frame = cv2.resize(display_frame, (w//2, h//2))
-                                ret_enc, buf = cv2.imencode('.jpg', preview_frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
-                                if ret_enc: encoded_jpeg = buf.tobytes()
-                                
-                        elif self.usage_mode == 'scan':
-                            # Scan: Medium Resolution for visual, High FPS
-                            h, w = display_frame.shape[:2]
-                            if w > 640:
-                                scale = 640 / w
-                                new_h = int(h * scale)
-                                scan_frame = cv2.resize(display_frame, (640, new_h))
-                                ret_enc, buf = cv2.imencode('.jpg', scan_frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
-                                if ret_enc: encoded_jpeg = buf.tobytes()
-                            else:
-                                ret_enc, buf = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
-                                if ret_enc: encoded_jpeg = buf.tobytes()
-                        else:
-                            # Record: High Quality Preview
-                            ret_enc, buf = cv2.imencode('.jpg', display_frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
-                            if ret_enc: encoded_jpeg = buf.tobytes()
-                            
-                    except Exception as e:
-                        print(f"JPEG Encode Error: {e}")
+                    source_jpeg = self.cap.jpeg if passthrough else None
+                    has_viewers = bool(renditions)
+                    encoded = {}
+                    
+                    if frame is not None:
+                        # Pool buffers follow the backend's frame size (first frame, size change)
+                        frame_shape = frame.shape
+                        
+                        # [ANTIGRAVITY] SEPARATION OF CONCERNS
+                        # raw_frame: UNTOUCHED full resolution (for Recording)
+                        # display_frame: Zoomed/Cropped (for Preview/Scanner)
+                        # Published frames are immutable: consumers share references,
+                        # anyone who needs to draw on a frame asks for a copy
+                        frame.flags.writeable = False
+                        raw_frame = frame
+                        
+                        if has_viewers:
+                            encode_started = time.perf_counter()
+                            encoded = self._encode_renditions(frame, renditions, source_jpeg)
+                            self.stats.record_encode(time.perf_counter() - encode_started, set(encoded.values()))
+                        
+                        # Sequenced history for recorders/scanners that consume at their own pace
+                        self.frames.push(raw_frame, captured_at)
+                    else:
+                        # MJPEG passthrough: every viewer gets the device's own JPEG
+                        self.passthrough_frames += 1
+                        if has_viewers:
+                            encoded = dict.fromkeys(renditions, source_jpeg)
+                            self.stats.record_encode(0.0, {source_jpeg})
+                    encoded_jpeg = next(iter(encoded.values()), None)
+                    
+                    if self.first_frame_at is None:
+                        self.first_frame_at = captured_at
 
                     with self.lock:
                         # CRITICAL: Store RAW FRAME for recording/barcode (Full View)
-                        self.last_frame = raw_frame
+                        # (passthrough keeps the JPEG; get_raw_frame decodes it on request)
+                        if frame is not None:
+                            self.last_frame = raw_frame
+                        self.pending_jpeg = None if frame is not None else source_jpeg
                         # Store ZOOMED/PROCESSED JPEG for streaming (User View)
-                        if encoded_jpeg:
+                        # (cleared while idle so a new viewer never sees a stale frame)
+                        if encoded_jpeg or not has_viewers:
                             self.last_jpeg = encoded_jpeg
                         self.last_update = time.time()
                         self.consecutive_errors = 0
                         last_frame_time = current_time
+                    
+                    # Wake MJPEG viewers (outside the camera lock)
+                    if encoded:
+                        self.hub.publish(encoded, captured_at)
+                    elif not has_viewers:
+                        self.hub.clear()
+
+                    if self.state == 'reconnecting':
+                        # Recovered before the capture had to be reopened
+                        self.downtime_total += time.time() - self.down_since
+                        self.down_since = None
+                        self.state = 'live'
 
                 else:
                     self.consecutive_errors += 1
+                    if self.state == 'live':
+                        # Mark the outage at once: a stale-looking camera that is
+                        # 'reconnecting' is not replaced by get_camera_stream()
+                        self.state = 'reconnecting'
+                        self.down_since = time.time()
                     if self.consecutive_errors > 5 and (time.time() - last_error_emit > 5.0):
                          try:
                             if socketio: socketio.emit('camera_error', {'url': self.url, 'error': 'Connection lost'})
                             last_error_emit = time.time()
                          except: pass
                     
-                    if self.consecutive_errors > 50:
-                        self.running = False
-                        break
+                    if self.consecutive_errors > RECONNECT_AFTER_ERRORS:
+                        # Stream lost: release it so the reconnect below reopens it
+                        self._release_capture()
                             
                     time.sleep(0.1)
             else:
-                time.sleep(0.5)
+                # Capture closed (errors above, or the ffmpeg/capture child exited)
+                if not self._reconnect(is_local, use_ffmpeg):
+                    self.running = False
+                    break
+                # Fresh capture: back at config size/fps until adapt() re-applies
+                applied_profile = (config.VIDEO_FPS, (config.VIDEO_WIDTH, config.VIDEO_HEIGHT))
+                last_frame_time = 0
         
         # Cleanup
-        if self.cap:
-             # [ANTIGRAVITY] Clean Release with Hardware Lock
-            try:
-                # We should try to acquire lock for release too, strictly speaking,
-                # but typical pattern is: owning thread releases.
-                # However, to sync with the 'update' of the NEXT thread, we should hold it.
-                # But safe_hardware_lock might be held by US if we were in the 'with' block?
-                # No, we only hold it during INIT. 
-                
-                # So here we just release. The NEXT thread will wait on the lock.
-                # BUT we need to make sure we don't return until it's really gone.
-                
-                with safe_hardware_lock(self.url, timeout=5.0):
-                    self.cap.release()
-                    print(f"[Camera] {self.url} released (Worker Thread)")
-                    
-                # [ANTIGRAVITY] COOLDOWN: Give Windows Drivers time to breathe
-                time.sleep(1.0) 
-            except Exception as e: 
-                print(f"[Camera] Release error: {e}")
+        self.state = 'stopped'
+        self._release_capture()
+
+
+    def _passes_through(self, renditions, shape):
+        """
+        True when the source JPEG (MJPEG passthrough) can be sent as-is to
+        every rendition: no zoom crop and no downscale below the source width.
+        JPEG quality is whatever the device chose.
+        """
+        current_zoom = self.zoom_level
+        for rendition in renditions:
+            zoom = rendition.zoom if rendition.zoom is not None else current_zoom
+            if zoom > 1.0 or 0 < rendition.width < shape[1]:
+                return False
+        return True
+    
+    def _encode_renditions(self, frame, renditions, source_jpeg=None):
+        """
+        Encode each subscribed rendition of this frame.
+        Renditions resolving to the same (width, quality, zoom) share one encode,
+        and the cropped/resized image is shared between qualities. With a
+        source_jpeg (MJPEG passthrough) renditions that need no crop/resize
+        reuse it instead of encoding.
+        
+        Returns:
+            dict of Rendition -> JPEG bytes
+        """
+        current_zoom = self.zoom_level
+        scaled_cache = {}
+        jpeg_cache = {}
+        encoded = {}
+        
+        for rendition in renditions:
+            if source_jpeg is not None and self._passes_through((rendition,), frame.shape):
+                encoded[rendition] = source_jpeg
+                continue
+            zoom = rendition.zoom if rendition.zoom is not None else current_zoom
+            key = (rendition.width, rendition.quality, zoom)
             
-            self.cap = None
+            if key not in jpeg_cache:
+                jpeg_cache[key] = None
+                try:
+                    size_key = (rendition.width, zoom)
+                    if size_key not in scaled_cache:
+                        scaled_cache[size_key] = self._render_frame(frame, zoom, rendition.width)
+                    jpeg_cache[key] = jpeg_encoder.encode(scaled_cache[size_key], rendition.quality)
+                except Exception as e:
+                    print(f"JPEG Encode Error: {e}")
+            
+            if jpeg_cache[key]:
+                encoded[rendition] = jpeg_cache[key]
+        
+        return encoded
+    
+    def _render_geometry(self, shape, zoom, width):
+        """
+        Crop and output size for one (frame size, zoom, rendition width),
+        computed once and cached. Zoom is a centered crop; the output is the
+        source size, capped at width (0 = native) keeping the aspect ratio.
+        
+        Returns:
+            Tuple of ((y0, y1, x0, x1), (out_w, out_h) or None if no resize, interpolation)
+        """
+        key = (shape[0], shape[1], zoom, width)
+        geometry = self.geometry.get(key)
+        if geometry is None:
+            h, w = shape[:2]
+            roi = (0, h, 0, w)
+            if zoom > 1.0:
+                crop_w, crop_h = int(w / zoom), int(h / zoom)
+                x, y = (w - crop_w) // 2, (h - crop_h) // 2
+                roi = (y, y + crop_h, x, x + crop_w)
+            out_w = width if 0 < width < w else w
+            size = (out_w, int(h * out_w / w))
+            if size == (w, h) and zoom <= 1.0:
+                size = None
+            # Area averaging when shrinking; it degrades to nearest-neighbour when enlarging
+            crop_w = roi[3] - roi[2]
+            interpolation = cv2.INTER_AREA if size is None or size[0] <= crop_w else cv2.INTER_LINEAR
+            geometry = (roi, size, interpolation)
+            if len(self.geometry) > 64:
+                self.geometry.clear()
+            self.geometry[key] = geometry
+        return geometry
+    
+    def _render_frame(self, frame, zoom, width):
+        """
+        One rendition image straight from the source ROI: crop and scale in a
+        single resize into a reusable scratch buffer (capture thread only,
+        encoded before the next frame and never published).
+        """
+        (y0, y1, x0, x1), size, interpolation = self._render_geometry(frame.shape, zoom, width)
+        if size is None:
+            return frame
+        shape = (size[1], size[0]) + frame.shape[2:]
+        dst = self.scratch.get((zoom, width))
+        if dst is None or dst.shape != shape:
+            dst = self.scratch[(zoom, width)] = np.empty(shape, dtype=np.uint8)
+        try:
+            return cv2.resize(frame[y0:y1, x0:x1], size, dst=dst, interpolation=interpolation)
+        except Exception as e:
+            print(f"Zoom error: {e}")
+            return frame # Fallback
 
     
     def get_frame(self):
@@ -401,49 +1514,123 @@ class VideoCamera:
             return self.last_jpeg
 
     
-    def get_raw_frame(self):
-        """Get raw CV2 frame for processing (barcode detection)"""
+    def get_raw_frame(self, copy=False):
+        """
+        Get raw CV2 frame for processing (barcode detection, recording).
+        
+        Args:
+            copy: Return a private writable copy instead of the shared
+                  read-only frame (only for consumers that modify it).
+                  Always copied in process mode, where shared-memory slots
+                  are reused after CAPTURE_SLOTS frames.
+        """
         with self.lock:
-            if self.last_frame is None:
-                return None
+            frame = self.last_frame
+            pending = self.pending_jpeg
             self.last_access = time.time()
-            return self.last_frame.copy()
+        if pending is not None:
+            frame = self._decode_pending(pending, frame)
+        if frame is None:
+            return None
+        return frame.copy() if copy or self.capture_process else frame
 
-    def get_scan_frame(self):
+    def _decode_pending(self, jpeg, fallback):
+        """
+        MJPEG passthrough: decode the newest source JPEG on request (scanner,
+        snapshot) and keep it as last_frame until the capture loop moves on.
+        
+        Returns:
+            The decoded read-only frame, or fallback if the JPEG is corrupt
+        """
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return fallback
+        frame.flags.writeable = False
+        with self.lock:
+            if self.pending_jpeg is jpeg:
+                self.last_frame = frame
+                self.pending_jpeg = None
+        self.lazy_decodes += 1
+        return frame
+
+    def frames_since(self, seq, consumer=None):
+        """
+        Raw frames captured after sequence number seq (see FrameRing.frames_since).
+        
+        Returns:
+            Tuple of (list of (seq, timestamp, frame), number of frames missed)
+        """
+        self.last_access = time.time()
+        return self.frames.frames_since(seq, consumer)
+    
+    def wait_for_frame(self, seq, timeout=None):
+        """
+        Block the calling thread/greenlet until a frame newer than seq is captured.
+        
+        Returns:
+            bool: True if a newer frame exists, False on timeout
+        """
+        return self.frames.wait(seq, timeout)
+    
+    def get_stats(self):
+        """
+        Capture telemetry: achieved vs target fps, read/encode timings,
+        JPEG size, dropped/duplicated frames and per-consumer lag.
+        """
+        stats = self.stats.snapshot()
+        viewers = self.hub.subscriber_stats()
+        consumers = self.frames.consumer_stats()
+        stats.update({
+            'url': self.url,
+            'running': self.running,
+            'target_fps': self.target_fps,
+            'capture_size': list(self.capture_size),
+            'demand': self.demand,
+            'usage_mode': self.usage_mode,
+            'state': self.state,
+            'consecutive_errors': self.consecutive_errors,
+            'reconnect_attempts': self.reconnect_attempts,
+            'reconnects': self.reconnects,
+            'downtime_s': round(self.downtime_total + (time.time() - self.down_since if self.down_since else 0), 1),
+            'frame_age_ms': round((time.time() - self.last_update) * 1000, 1),
+            'dropped': sum(v['dropped'] for v in viewers) + sum(c['missed'] for c in consumers),
+            'jpeg_encoder': jpeg_encoder.name,
+            'mjpeg_passthrough': isinstance(self.cap, JPEGCapture),
+            'passthrough_frames': self.passthrough_frames,
+            'lazy_decodes': self.lazy_decodes,
+            'frame_buffers': len(self.pool.buffers),
+            'buffer_allocations': self.pool.allocations,
+            'viewers': viewers,
+            'consumers': consumers,
+        })
+        return stats
+
+    def get_scan_frame(self, copy=False):
         """
         Get frame for scanning, applying Zoom/Crop if active.
         [ANTIGRAVITY] Fix: Ensure what is seen (Zoom) is what is scanned.
+        
+        The crop is a read-only view of the shared frame; pass copy=True
+        for a writable copy.
         """
         with self.lock:
-            if self.last_frame is None:
-                return None
-            
-            frame = self.last_frame.copy()
+            frame = self.last_frame
+            pending = self.pending_jpeg
+            zoom_level = self.zoom_level
             self.last_access = time.time()
-            
-            # Apply Zoom if needed
-            if self.zoom_level > 1.0:
-                try:
-                    h, w = frame.shape[:2]
-                    center_x, center_y = w // 2, h // 2
-                    radius_x, radius_y = int(w / (2 * self.zoom_level)), int(h / (2 * self.zoom_level))
-                    
-                    min_x, max_x = center_x - radius_x, center_x + radius_x
-                    min_y, max_y = center_y - radius_y, center_y + radius_y
-                    
-                    # Ensure within bounds
-                    min_x = max(0, min_x)
-                    min_y = max(0, min_y)
-                    max_x = min(w, max_x)
-                    max_y = min(h, max_y)
-                    
-                    cropped = frame[min_y:max_y, min_x:max_x]
-                    return cropped # Return cropped (zoomed into ROI)
-                except Exception as e:
-                    print(f"Zoom crop error: {e}")
-                    return frame
-            
-            return frame
+            self.last_scan_request = self.last_access
+        
+        if pending is not None:
+            frame = self._decode_pending(pending, frame)
+        if frame is None:
+            return None
+        
+        # Apply Zoom if needed (same crop as the preview renditions)
+        if zoom_level > 1.0:
+            y0, y1, x0, x1 = self._render_geometry(frame.shape, zoom_level, 0)[0]
+            frame = frame[y0:y1, x0:x1] # Cropped (zoomed into ROI)
+        
+        return frame.copy() if copy or self.capture_process else frame
 
     def update_heartbeat(self):
         """Update the heartbeat timestamp"""
@@ -451,129 +1638,406 @@ class VideoCamera:
             self.last_heartbeat = time.time()
 
 
+# ============================================
+# MAIN / SUB STREAM PAIRING
+# ============================================
+# A camera_list entry may declare "sub_url": a low-resolution stream of the
+# same camera. Live views (preview, scan, monitoring) decode the sub-stream,
+# recording uses "url" (the main stream, remuxed as-is in 'copy' mode).
+
+_stream_pairs = {'mtime': None, 'sub': {}, 'main': {}, 'enabled': []}
+_stream_pairs_lock = threading.Lock()
+
+def _get_stream_pairs():
+    """
+    main url -> sub url and sub url -> main url (plus the enabled cameras'
+    URLs), reloaded when config.json changes
+    """
+    with _stream_pairs_lock:
+        try:
+            mtime = config.CONFIG_FILE.stat().st_mtime
+        except OSError:
+            return _stream_pairs
+        
+        if mtime != _stream_pairs['mtime']:
+            sub, main, enabled = {}, {}, []
+            try:
+                import json
+                with open(config.CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    cameras = json.load(f).get('camera_list', [])
+                for cam in cameras:
+                    url, sub_url = str(cam.get('url', '')), cam.get('sub_url')
+                    if url and sub_url:
+                        sub[url] = str(sub_url)
+                        main[str(sub_url)] = url
+                    if url and cam.get('enabled', True):
+                        enabled.append(url)
+            except Exception as e:
+                print(f"[Camera] Could not load stream pairs: {e}")
+            _stream_pairs.update(mtime=mtime, sub=sub, main=main, enabled=enabled)
+        return _stream_pairs
+
+def live_stream_url(url):
+    """URL to decode for preview/scan/monitoring: the paired sub-stream if declared"""
+    return _get_stream_pairs()['sub'].get(str(url), url)
+
+def recording_stream_url(url):
+    """URL to record from: the main stream (also when given its sub-stream URL)"""
+    return _get_stream_pairs()['main'].get(str(url), url)
+
+def enabled_camera_urls():
+    """Configured URLs of the cameras marked enabled in camera_list"""
+    return list(_get_stream_pairs()['enabled'])
+
+
 # ============================================
 # CAMERA MANAGER
 # ============================================
 
-active_cameras = {}
+active_cameras = {}  # stream URL -> VideoCamera; lifecycle in cam.state
+# Guards the dict only. Never held while a camera starts or stops, so one
+# stuck camera cannot block requests for the others.
 camera_lock = threading.Lock()
+_camera_url_locks = {}  # stream URL -> lock serialising bring-up of that URL
+_main_hub = gevent.get_hub()
 
-def get_camera_stream(url):
-    """Get or create camera stream"""
+def _camera_url_lock(url):
     with camera_lock:
-        # Check if camera already exists
-        if url in active_cameras:
-            cam = active_cameras[url]
-            # Check if camera is still healthy
-            # Also check if cap is None (validation failed)
-            # [ANTIGRAVITY] FIX: Grace period for async init!
-            # If camera is created < 5s ago, it is allowed to have cap=None (still initing)
-            is_starting_up = (time.time() - cam.start_time) < 5.0
-            
-            if not is_starting_up and (cam.cap is None or not cam.running or (time.time() - cam.last_update >= 5.0)):
-                # Camera is dead or invalid, remove it
-                print(f"[Camera] Removing dead/invalid camera {url} from active_cameras")
-                cam.stop()
-                del active_cameras[url]
-            else:
-                return cam
+        return _camera_url_locks.setdefault(url, threading.Lock())
+
+def _is_camera_healthy(cam):
+    """Starting, live or reconnecting (and not stale)"""
+    # [ANTIGRAVITY] FIX: Grace period for async init!
+    # If camera is created < 5s ago, it is allowed to have cap=None (still initing)
+    if cam.state == 'starting' and (time.time() - cam.start_time) < 5.0:
+        return True
+    # Reconnecting cameras are kept: subscribers/recorders stay attached
+    if cam.running and cam.state == 'reconnecting':
+        return True
+    # Also check if cap is None (validation failed)
+    return cam.cap is not None and cam.running and (time.time() - cam.last_update < 5.0)
+
+def _stop_camera_async(cam):
+    """
+    Stop a camera already removed from active_cameras. The join and hardware
+    release take seconds, so they run in a greenlet on the main hub (also
+    when called from a worker thread) and the caller returns immediately.
+    """
+    cam.state = 'stopping'
+    cam.running = False
+    _main_hub.loop.run_callback_threadsafe(gevent.spawn, cam.stop)
+
+def retire_camera(url):
+    """
+    Remove the camera for a stream URL from the registry and stop it in the
+    background. A new get_camera_stream() for the URL may start right away
+    (local devices wait for the hardware lock the old capture releases).
+    
+    Returns:
+        The retired VideoCamera, or None if it was not active
+    """
+    with camera_lock:
+        cam = active_cameras.pop(url, None)
+    if cam is not None:
+        _stop_camera_async(cam)
+    return cam
+
+def get_camera_stream(url, purpose='live', warm=False):
+    """
+    Get or create camera stream.
+    
+    Args:
+        url: Camera URL as configured (main stream URL or index)
+        purpose: 'live' decodes the paired sub-stream when one is declared,
+                 'record' always uses the main stream
+        warm: Pre-connect only (warm pool); the camera idles at the minimal
+              profile until the first regular call
+    """
+    url = recording_stream_url(url) if purpose == 'record' else live_stream_url(url)
+    cam = _get_healthy_camera(url)
+    if cam is None:
+        # Bring-up is serialised per URL only; other cameras are not blocked
+        with _camera_url_lock(url):
+            cam = _get_healthy_camera(url)
+            if cam is None:
+                return _create_camera(url, warm)
+    
+    if cam.prewarmed and not warm:
+        # First use of a warm camera: leave the minimal profile now
+        cam.prewarmed = False
+        cam.adapt()
+    return cam
+
+def _get_healthy_camera(url):
+    """Registered camera for url; a dead one is unregistered and stopped in the background"""
+    with camera_lock:
+        cam = active_cameras.get(url)
+        if cam is None or _is_camera_healthy(cam):
+            return cam
+        # Camera is dead or invalid, remove it
+        print(f"[Camera] Removing dead/invalid camera {url} from active_cameras")
+        del active_cameras[url]
+    _stop_camera_async(cam)
+    return None
+
+def _create_camera(url, warm):
+    """Start a camera and register it (caller holds the URL's bring-up lock)"""
+    try:
+        cam = VideoCamera(url)
+        cam.prewarmed = warm
         
-        # Create new camera
-        try:
-            cam = VideoCamera(url)
-            
-            # CRITICAL: Check if camera is actually valid
-            # [ANTIGRAVITY] RELAXED: Init is async now, so cap is ALWAYS None at first.
-            # We return the camera object optimistically.
-            # If validation failed in __init__, cap will be None
-            # if cam.cap is None:
-            #     print(f"[Camera] {url} failed validation, not adding to active cameras")
-            #     return None
-            
-            # Wait a moment for first frame
-            # [ANTIGRAVITY] RELAXED: Don't reject if frames aren't ready yet (Async validation)
-            # time.sleep(0.5)
-            # if cam.last_frame is None:
-            #     print(f"[Camera] {url} no frames after 0.5s, rejecting")
-            #     cam.stop()
-            #     return None
-            
+        # CRITICAL: Check if camera is actually valid
+        # [ANTIGRAVITY] RELAXED: Init is async now, so cap is ALWAYS None at first.
+        # We return the camera object optimistically.
+        # If validation failed in __init__, cap will be None
+        # if cam.cap is None:
+        #     print(f"[Camera] {url} failed validation, not adding to active cameras")
+        #     return None
+        
+        # Wait a moment for first frame
+        # [ANTIGRAVITY] RELAXED: Don't reject if frames aren't ready yet (Async validation)
+        # time.sleep(0.5)
+        # if cam.last_frame is None:
+        #     print(f"[Camera] {url} no frames after 0.5s, rejecting")
+        #     cam.stop()
+        #     return None
+        
+        with camera_lock:
             active_cameras[url] = cam
-            return cam
-        except Exception as e:
-            video_logger.error(f"Error creating camera {url}: {e}")
-            return None
+        return cam
+    except CapacityError as e:
+        video_logger.error(f"Camera {url} rejected: {e}")
+        try:
+            from app import socketio
+            socketio.emit('camera_error', {'url': url, 'error': str(e)})
+        except Exception:
+            pass
+        return None
+    except Exception as e:
+        video_logger.error(f"Error creating camera {url}: {e}")
+        return None
 
 
-def gen_frames(camera, processing_mode=None):
-    """Generator function for video streaming"""
-    while True:
-        try:
+def bring_up_cameras(urls, warm=False, timeout=30.0):
+    """
+    Start several cameras at once and wait until each delivers its first
+    frame. Every camera initialises on its own capture thread, and IP
+    cameras only serialise on their own device lock, so the total cold-start
+    time is about that of the slowest camera, not the sum.
+    
+    Returns:
+        dict of url -> seconds to first frame (None if it did not come up)
+    """
+    started = time.time()
+    cameras = {url: get_camera_stream(url, warm=warm) for url in urls}
+    results = {}
+    for url, cam in cameras.items():
+        if cam is None:
+            results[url] = None
+            continue
+        # Wakes on the first pushed frame; gives up early once the camera stopped
+        while cam.first_frame_at is None and cam.running and time.time() - started < timeout:
+            cam.frames.wait(0, timeout=0.5)
+        results[url] = round(max(0.0, cam.first_frame_at - started), 2) if cam.first_frame_at else None
+    return results
+
+
+def start_warm_camera_pool():
+    """
+    Pre-connect every enabled camera in the background (config warm_camera_pool),
+    so the first preview/scan of the shift does not wait for camera bring-up.
+    """
+    if not config.WARM_CAMERA_POOL:
+        return
+    urls = enabled_camera_urls()
+    
+    def warm_up():
+        started = time.time()
+        results = bring_up_cameras(urls, warm=True)
+        live = [u for u, t in results.items() if t is not None]
+        print(f"[Camera] Warm pool: {len(live)}/{len(urls)} camera(s) live in {time.time() - started:.1f}s")
+    
+    gevent.spawn(warm_up)
+    print(f"[Camera] Warm pool: pre-connecting {len(urls)} camera(s)")
+
+
+def get_camera_pool_status():
+    """
+    Warm/cold state of every enabled camera, keyed by configured URL:
+    'warm' (connected, frames flowing), 'starting' (bring-up in progress)
+    or 'cold' (not connected). 'prewarmed' is True until first use.
+    """
+    pool = {}
+    for url in enabled_camera_urls():
+        with camera_lock:
+            cam = active_cameras.get(live_stream_url(url))
+        if cam is None or not cam.running:
+            state = 'cold'
+        elif cam.last_frame is None:
+            state = 'starting'
+        else:
+            state = 'warm'
+        pool[url] = {'state': state, 'prewarmed': bool(cam and cam.running and cam.prewarmed)}
+    return pool
+
+
+def get_camera_stats(url=None):
+    """Telemetry of one active camera (by configured URL) or of all active cameras"""
+    with camera_lock:
+        if url is not None:
+            cam = active_cameras.get(live_stream_url(url)) or active_cameras.get(url)
+            cameras = [cam] if cam else []
+        else:
+            cameras = list(active_cameras.values())
+    return [cam.get_stats() for cam in cameras]
+
+
+def gen_frames(camera, processing_mode=None, rendition=None):
+    """
+    Generator function for video streaming.
+    Each client holds a FrameHub subscription for one rendition and is only
+    woken for new frames.
+    """
+    if rendition is None:
+        rendition = RENDITION_PRESETS['scan' if processing_mode == 'scan' else 'preview']
+    subscription = camera.hub.subscribe(rendition)
+    try:
+        while True:
             # Standard Stream (Color) - Always yield color frame regardless of mode
             # Barcode detection happens in a separate thread/process
-            frame = camera.get_frame()
+            frame = subscription.get(timeout=1.0)
             if frame is None:
-                time.sleep(0.1)
+                if not camera.running:
+                    # Camera stopped/replaced: end the response so the client reconnects
+                    break
                 continue
             
+            camera.last_access = time.time()
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                   
-            # [ANTIGRAVITY] THROTTLE: Prevent "Firehose" Effect
-            # Without this, we send thousands of duplicate frames/sec, killing the network & browser
-            gevent.sleep(0.03) # Cap at ~30 FPS
-
-        except Exception as e:
-            # Prevent 500 error loop
-            time.sleep(0.5)
+    finally:
+        subscription.close()
 
 
 # ============================================
 # CAMERA DISCOVERY
 # ============================================
 
-def detect_local_cameras():
-    """Detect local USB/webcams"""
-    available_indices = []
-    max_index_to_test = 10
+# Local camera enumeration is cached: probing opens hardware, and the list
+# only changes on hotplug (detected on Linux via /dev/video*) or after the TTL
+LOCAL_CAMERA_MAX_INDEX = 10
+LOCAL_CAMERA_CACHE_TTL = 60.0
+
+_local_camera_cache = {'cameras': None, 'signature': None, 'expires': 0.0}
+_local_camera_cache_lock = threading.Lock()
+_local_camera_refresh_lock = threading.Lock()  # one enumeration at a time
+_local_probe_pool = ThreadPool(LOCAL_CAMERA_MAX_INDEX)  # real threads: opens block in C
+
+def _probe_local_camera(index):
+    """
+    Open one index and read a frame (probe thread). A busy index (hardware
+    lock held, e.g. by a starting camera) is reported as absent.
+    """
+    backends = local_capture_backends() + [("Default", cv2.CAP_ANY)]
+    for name, backend in backends:
+        try:
+            with safe_hardware_lock(index, timeout=1.0) as acquired:
+                if not acquired:
+                    return False
+                
+                cap = open_local_capture(index, backend, config.VIDEO_WIDTH, config.VIDEO_HEIGHT, config.VIDEO_FPS)
+                if cap is None:
+                    continue
+                try:
+                    # Some webcams need a moment before the first frame
+                    for _ in range(5):
+                        ret, _ = cap.read()
+                        if ret:
+                            return True
+                        time.sleep(0.1)
+                finally:
+                    cap.release()
+        except Exception:
+            pass
+    return False
+
+def _enumerate_local_cameras():
+    """
+    Local cameras present right now: the OS device listing where there is
+    one (Linux), otherwise all indices probed concurrently. Active cameras
+    are not re-opened.
     
-    print("[Camera] Detecting local cameras...")
+    Returns:
+        list of {'index', 'name'}
+    """
+    devices = list_video_devices()
+    if devices is not None:
+        return [{'index': d['index'], 'name': d['name']} for d in devices]
     
-    # Check active cameras first
     with camera_lock:
-        active_list = [int(u) for u in active_cameras.keys() if str(u).isdigit()]
+        active = {int(u) for u in active_cameras if str(u).isdigit()}
+    probes = {
+        i: _local_probe_pool.spawn(_probe_local_camera, i)
+        for i in range(LOCAL_CAMERA_MAX_INDEX) if i not in active
+    }
+    found = set(active)
+    for i, probe in probes.items():
+        if probe.get():
+            found.add(i)
+    return [{'index': i, 'name': f'Local Camera {i}'} for i in sorted(found)]
+
+def refresh_local_cameras(force=False):
+    """
+    Re-enumerate local cameras into the cache (concurrent callers share one
+    enumeration unless force).
     
-    for i in range(max_index_to_test):
-        if i in active_list:
-            available_indices.append({'index': i, 'name': f'Local Camera {i} (Active)'})
-            continue
-        
-        # Try to open camera
-        backends = [
-            ("DirectShow", cv2.CAP_DSHOW),
-            ("Media Foundation", cv2.CAP_MSMF),
-            ("Default", cv2.CAP_ANY)
-        ]
+    Returns:
+        list of {'index', 'name'}
+    """
+    with _local_camera_refresh_lock:
+        with _local_camera_cache_lock:
+            cache = dict(_local_camera_cache)
+        if not force and cache['cameras'] is not None and time.time() < cache['expires']:
+            return cache['cameras']
         
-        for name, backend in backends:
-            try:
-                with safe_hardware_lock(i, timeout=1.0) as acquired:
-                    if not acquired:
-                        continue
-                    
-                    cap = cv2.VideoCapture(i, backend)
-                    if cap and cap.isOpened():
-                        time.sleep(0.5)
-                        ret, _ = cap.read()
-                        if ret:
-                            available_indices.append({'index': i, 'name': f'Local Camera {i}'})
-                            cap.release()
-                            break
-                        cap.release()
-            except:
-                pass
+        signature = video_device_signature()
+        started = time.time()
+        cameras = _enumerate_local_cameras()
+        with _local_camera_cache_lock:
+            _local_camera_cache.update(
+                cameras=cameras, signature=signature, expires=time.time() + LOCAL_CAMERA_CACHE_TTL
+            )
+        print(f"[Camera] Detected {len(cameras)} local camera(s) in {time.time() - started:.2f}s")
+        return cameras
+
+def detect_local_cameras(refresh=False):
+    """
+    Detect local USB/webcams (cached, see LOCAL_CAMERA_CACHE_TTL).
+    
+    A hotplug (change in /dev/video*) drops the cache; an expired cache is
+    still answered immediately and re-enumerated in the background.
+    
+    Args:
+        refresh: Re-enumerate now instead of using the cache
+    """
+    with _local_camera_cache_lock:
+        cameras = _local_camera_cache['cameras']
+        expired = time.time() >= _local_camera_cache['expires']
+        if cameras is not None and video_device_signature() != _local_camera_cache['signature']:
+            print("[Camera] Local camera hotplug detected")
+            cameras = _local_camera_cache['cameras'] = None
+    
+    if refresh or cameras is None:
+        cameras = refresh_local_cameras(force=refresh)
+    elif expired and not _local_camera_refresh_lock.locked():
+        gevent.spawn(refresh_local_cameras)
     
-    return available_indices
+    with camera_lock:
+        active = {int(u) for u in active_cameras if str(u).isdigit()}
+    return [
+        {'index': c['index'], 'name': f"{c['name']} (Active)" if c['index'] in active else c['name']}
+        for c in cameras
+    ]
 
 
 def perform_camera_discovery(timeout=3.0):
@@ -820,8 +2284,8 @@ def is_camera_online(url):
     # [ANTIGRAVITY] Optimization: If camera is already active and streaming, it's definitely online.
     # This prevents 'safe_hardware_lock' from stealing the stream from the main thread (VideoCamera).
     with camera_lock:
-        if url in active_cameras:
-            cam = active_cameras[url]
+        cam = active_cameras.get(url) or active_cameras.get(live_stream_url(url))
+        if cam:
             if cam.running:
                 # Update last checked timestamp in background
                 return True
@@ -833,11 +2297,12 @@ def is_camera_online(url):
                 if not acquired:
                     return False
                 
-                cap = cv2.VideoCapture(int(url), cv2.CAP_DSHOW)
-                if cap.isOpened():
-                    ret, _ = cap.read()
-                    cap.release()
-                    return ret
+                for name, backend in local_capture_backends():
+                    cap = open_local_capture(int(url), backend, config.VIDEO_WIDTH, config.VIDEO_HEIGHT, config.VIDEO_FPS)
+                    if cap is not None:
+                        ret, _ = cap.read()
+                        cap.release()
+                        return ret
                 return False
         except:
             return False
@@ -875,12 +2340,15 @@ def _check_single_camera_status(url):
         in_use = False
         in_use_by = None
         purpose = None
+        viewers = 0
         
+        live_url = live_stream_url(url)
         with camera_lock:
-            if url in active_cameras:
+            if live_url in active_cameras:
                 in_use = True
                 in_use_by = "System"
                 purpose = "Streaming"
+                viewers = active_cameras[live_url].hub.subscriber_count
         
         return {
             'url': url,
@@ -888,6 +2356,7 @@ def _check_single_camera_status(url):
             'in_use': in_use,
             'in_use_by': in_use_by,
             'purpose': purpose,
+            'viewers': viewers,
             'last_checked': time.time()
         }
     except Exception as e:
@@ -971,17 +2440,45 @@ def mark_camera_in_use(url, username, purpose):
         }
 
 
+def retire_recording_camera(url):
+    """
+    Stop the main-stream camera a recorder opened (purpose='record') once
+    nobody uses it. Only applies to paired cameras: without a sub-stream the
+    recorder shares the live camera, which release_camera() handles.
+    
+    Returns:
+        The retired VideoCamera, or None
+    """
+    record_url = recording_stream_url(url)
+    if record_url == live_stream_url(url):
+        return None
+    with camera_lock:
+        cam = active_cameras.get(record_url)
+    if cam is None or cam.hub.subscriber_count > 0 or cam.frames.consumer_stats():
+        return None
+    return retire_camera(record_url)
+
 def release_camera(url):
     """Release camera from usage"""
     with camera_usage_lock:
         if url in camera_usage:
             del camera_usage[url]
     
-    # Also stop the camera stream
+    # A recorder's main-stream camera left behind (recorder crashed) goes too
+    retire_recording_camera(url)
+    
+    # Also stop the camera stream (warm pool: keep it connected at the minimal profile)
+    keep_warm = config.WARM_CAMERA_POOL and url in enabled_camera_urls()
+    url = live_stream_url(url)
     with camera_lock:
-        if url in active_cameras:
-            active_cameras[url].stop()
-            del active_cameras[url]
+        cam = active_cameras.get(url)
+    if cam is None:
+        return
+    if keep_warm and cam.running:
+        cam.prewarmed = True
+        cam.adapt()
+        return
+    retire_camera(url)
 
 
 # ============================================
@@ -993,22 +2490,20 @@ def camera_watchdog():
     while True:
         try:
             with camera_lock:
-                # Create copy of keys to avoid modification during iteration
-                urls = list(active_cameras.keys())
-                now = time.time()
-                
-                for url in urls:
-                    cam = active_cameras[url]
-                    # Check timeout (10 seconds)
-                    if (now - cam.last_heartbeat) > 10.0:
-                        print(f"[Watchdog] Camera {url} timed out (No heartbeat > 10s). Releasing...")
-                        cam.stop()
-                        del active_cameras[url]
-                        
-                        # Also clear usage
-                        with camera_usage_lock:
-                            if url in camera_usage:
-                                del camera_usage[url]
+                # Create copy to avoid modification during iteration
+                cameras = list(active_cameras.items())
+            now = time.time()
+            
+            for url, cam in cameras:
+                # Check timeout (10 seconds)
+                if (now - cam.last_heartbeat) > 10.0:
+                    print(f"[Watchdog] Camera {url} timed out (No heartbeat > 10s). Releasing...")
+                    retire_camera(url)
+                    
+                    # Also clear usage
+                    with camera_usage_lock:
+                        if url in camera_usage:
+                            del camera_usage[url]
                                 
         except Exception as e:
             print(f"[Watchdog] Error: {e}")
@@ -0,0 +1,98 @@
+"""
+Capture Controller
+==================
+Adaptive capture fps/resolution per camera.
+
+Each camera reports its current demand ('record', 'scan', 'preview',
+'idle' or 'warm') and gets a capture profile from a per-demand ladder. The resource
+monitor feeds system CPU load in; above CPU_HIGH the shared pressure level
+steps down one rung (every camera moves down its own ladder), below CPU_LOW
+it steps back up. Idle and preview ladders fall off steeply while the
+recording ladder barely moves, so under load the idle cameras yield first.
+
+Lower fps only saves decode work on local cameras. An IP stream is still
+decoded at the camera's own rate while throttled (see VideoCamera.update),
+so idle/warm IP cameras are cheap only on a low-resolution sub-stream
+(camera_list "sub_url").
+"""
+
+import threading
+
+import config
+
+# Pressure rises above CPU_HIGH and falls below CPU_LOW (hysteresis)
+CPU_HIGH = 85.0
+CPU_LOW = 60.0
+
+# demand -> [(fps, resolution scale vs video_width/video_height)] by pressure level
+CAPTURE_LADDERS = {
+    'record':  [(30, 1.0), (25, 1.0), (20, 1.0), (15, 1.0)],
+    'scan':    [(30, 1.0), (20, 1.0), (15, 1.0), (10, 1.0)],
+    'preview': [(15, 0.75), (10, 0.75), (8, 0.5), (5, 0.5)],
+    'idle':    [(5, 0.5), (2, 0.5), (1, 0.5), (1, 0.5)],
+    'warm':    [(1, 0.5)],  # warm pool: connected, unused
+}
+MAX_PRESSURE = max(len(ladder) for ladder in CAPTURE_LADDERS.values()) - 1
+
+
+class CaptureController:
+    """Shared CPU pressure level + demand -> capture profile mapping"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pressure = 0
+        self.last_cpu = 0.0
+
+    @property
+    def enabled(self):
+        return getattr(config, 'ADAPTIVE_CAPTURE', True)
+
+    def update_load(self, cpu_percent):
+        """
+        Feed the latest system CPU reading (called by the resource monitor).
+        Moves at most one level per call.
+
+        Returns:
+            int: The pressure level after this reading
+        """
+        with self.lock:
+            self.last_cpu = cpu_percent
+            previous = self.pressure
+            if cpu_percent >= CPU_HIGH and self.pressure < MAX_PRESSURE:
+                self.pressure += 1
+            elif cpu_percent <= CPU_LOW and self.pressure > 0:
+                self.pressure -= 1
+            level = self.pressure
+
+        if level != previous:
+            direction = 'down' if level > previous else 'up'
+            print(f"[CaptureController] CPU {cpu_percent:.0f}% -> stepping capture {direction} (pressure {level})")
+        return level
+
+    def profile_for(self, demand):
+        """
+        Capture profile for a demand level at the current pressure.
+
+        Returns:
+            Tuple of (fps, width, height)
+        """
+        max_fps = config.VIDEO_FPS
+        width, height = config.VIDEO_WIDTH, config.VIDEO_HEIGHT
+        if not self.enabled:
+            return max_fps, width, height
+
+        ladder = CAPTURE_LADDERS.get(demand, CAPTURE_LADDERS['preview'])
+        fps, scale = ladder[min(self.pressure, len(ladder) - 1)]
+        # Even sizes keep encoders and chroma subsampling happy
+        return min(fps, max_fps), int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
+
+    def get_status(self):
+        return {
+            'enabled': self.enabled,
+            'pressure': self.pressure,
+            'cpu': self.last_cpu,
+        }
+
+
+# Global instance
+capture_controller = CaptureController()
@@ -0,0 +1,365 @@
+"""
+Capture Process
+===============
+Runs one camera's capture loop in its own OS process.
+
+The child opens the camera, decodes frames straight into a ring of
+multiprocessing.shared_memory slots and announces each new frame with a
+one-line JSON message on its stdout. The web process maps the same block
+read-only, so decoding no longer competes with Flask/SocketIO for the GIL
+and a crashing camera driver only kills its own process.
+
+CaptureProcess mimics the parts of cv2.VideoCapture that VideoCamera uses,
+so the capture loop is the same in both modes.
+
+This file is also the child's entry point and is executed by path, so it
+must only import the standard library, numpy and OpenCV.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# Frame slots per camera. More than the VideoCamera ring (8) so frames a
+# consumer still holds are not overwritten for about half a second.
+CAPTURE_SLOTS = 16
+
+# Header: int64 latest seq, then float64 timestamp per slot (64-byte aligned)
+_HEADER_BYTES = 64 + 8 * CAPTURE_SLOTS
+_HEADER_BYTES += (-_HEADER_BYTES) % 64
+
+
+def _map_ring(buf, shape, slots):
+    """Numpy views over a shared block: (seq array, timestamps, frame slots)"""
+    seq = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+    timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=64)
+    frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=buf, offset=_HEADER_BYTES)
+    return seq, timestamps, frames
+
+
+# ============================================
+# PARENT SIDE (WEB PROCESS)
+# ============================================
+
+class CaptureProcess:
+    """
+    cv2.VideoCapture look-alike backed by a capture child process.
+
+    Construct it on the gevent hub thread (spawning a child is not possible
+    from threadpool threads); wait_ready(), read() and release() are plain
+    blocking calls meant for the camera's worker thread.
+    """
+
+    def __init__(self, url, width=1280, height=720, fps=30):
+        self.url = str(url)
+        self.proc = None
+        self.shm = None
+        self.shape = None
+        self._seq = None
+        self._timestamps = None
+        self._frames = None
+        self._reader = None
+        self._writer = None
+        self.last_seq = 0
+        self.opened = False
+
+        cmd = [
+            sys.executable, os.path.abspath(__file__),
+            '--url', self.url,
+            '--width', str(width), '--height', str(height), '--fps', str(fps),
+        ]
+        child_in, parent_out = os.pipe()
+        parent_in, child_out = os.pipe()
+        try:
+            self.proc = subprocess.Popen(cmd, stdin=child_in, stdout=child_out)
+            self._reader = os.fdopen(parent_in, 'rb')
+            self._writer = os.fdopen(parent_out, 'wb')
+        except Exception as e:
+            print(f"[CaptureProcess] {self.url} failed to start: {e}")
+            os.close(parent_in)
+            os.close(parent_out)
+        finally:
+            os.close(child_in)
+            os.close(child_out)
+
+    def wait_ready(self):
+        """
+        Block until the child has opened the camera (it gives up on its own
+        after its retries). Returns True once frames are shared.
+        """
+        while self.proc:
+            msg = self._recv()
+            if msg is None:
+                break
+            if msg.get('event') == 'ready':
+                self._attach(msg['shm'], msg['shape'])
+                return True
+            if msg.get('event') == 'failed':
+                print(f"[CaptureProcess] {self.url} could not open camera: {msg.get('error')}")
+                break
+        return False
+
+    def _attach(self, name, shape):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: no track argument, and attaching registers the block
+            # with our resource tracker, which would unlink it again at exit
+            self.shm = shared_memory.SharedMemory(name=name)
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self.shape = tuple(shape)
+        self._seq, self._timestamps, self._frames = _map_ring(self.shm.buf, self.shape, CAPTURE_SLOTS)
+        self._frames.flags.writeable = False
+        self.opened = True
+        print(f"[CaptureProcess] {self.url} attached (pid {self.proc.pid}, {shape[1]}x{shape[0]})")
+
+    def _recv(self):
+        """Next JSON message from the child, None when it has exited"""
+        try:
+            line = self._reader.readline()
+        except Exception:
+            return None
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return {}
+
+    def _send(self, msg):
+        try:
+            self._writer.write((json.dumps(msg) + '\n').encode())
+            self._writer.flush()
+            return True
+        except Exception:
+            return False
+
+    def isOpened(self):
+        return self.opened and self.proc is not None and self.proc.poll() is None
+
+    def read(self):
+        """Block until a newer frame exists. Returns (ret, read-only frame view)."""
+        if not self.opened:
+            return False, None
+        while True:
+            msg = self._recv()
+            if msg is None:
+                self.opened = False
+                return False, None
+            if msg.get('event') == 'error':
+                return False, None
+            seq = int(self._seq[0])
+            if seq == self.last_seq:
+                # Stale notification (we already returned this frame)
+                continue
+            self.last_seq = seq
+            return True, self._frames[seq % CAPTURE_SLOTS]
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH and self.shape:
+            return float(self.shape[1])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT and self.shape:
+            return float(self.shape[0])
+        return 0.0
+
+    def set(self, prop, value):
+        """Only FPS can be changed after start; size is fixed by the shared block"""
+        if prop == cv2.CAP_PROP_FPS:
+            return self._send({'fps': value})
+        return False
+
+    def request_stop(self):
+        """Tell the child to exit without waiting (safe from any thread)"""
+        if self.proc:
+            self._send({'stop': True})
+
+    def release(self, timeout=5.0):
+        self.opened = False
+        if self.proc:
+            self._send({'stop': True})
+            # Parent side only (the child must not import the app)
+            from app.utils.safe_execution import wait_process
+            try:
+                wait_process(self.proc, timeout)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+            self.proc = None
+        for f in (self._writer, self._reader):
+            try:
+                if f:
+                    f.close()
+            except Exception:
+                pass
+        self._writer = self._reader = None
+        if self.shm:
+            self._seq = self._timestamps = self._frames = None
+            try:
+                self.shm.close()
+            except Exception:
+                pass
+            self.shm = None
+
+
+# ============================================
+# CHILD SIDE (CAPTURE PROCESS)
+# ============================================
+
+def _emit(msg):
+    # sys.stdout is redirected to stderr in the child; the real stdout is the channel
+    sys.__stdout__.buffer.write((json.dumps(msg) + '\n').encode())
+    sys.__stdout__.buffer.flush()
+
+
+def _open_local(index):
+    """
+    Same backends as app.services.local_capture (not importable here):
+    DSHOW then MSMF on Windows, V4L2 with MJPG on Linux. Frames are decoded
+    into shared memory anyway, so there is no JPEG passthrough.
+    """
+    system = platform.system()
+    if system == 'Linux':
+        cap = cv2.VideoCapture(index, cv2.CAP_V4L2)
+        # Pixel format first, the size/fps below are then negotiated for MJPG
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        return cap
+    if system != 'Windows':
+        return cv2.VideoCapture(index)
+    cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        cap.release()
+        cap = cv2.VideoCapture(index, cv2.CAP_MSMF)
+    return cap
+
+
+def _open_capture(url, width, height, fps):
+    """Open and validate the camera (same retry/warmup policy as VideoCamera)"""
+    for attempt in range(1, 4):
+        print(f"[CaptureProcess] {url} Init Attempt {attempt}/3...")
+        if url.isdigit():
+            cap = _open_local(int(url))
+        else:
+            cap = cv2.VideoCapture(url)
+
+        if cap.isOpened():
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            cap.set(cv2.CAP_PROP_FPS, fps)
+
+            # WARMUP / VALIDATION
+            frame = None
+            valid_frames = 0
+            for _ in range(10):
+                ret, test = cap.read()
+                if ret and test is not None and test.size > 0:
+                    valid_frames += 1
+                    frame = test
+                time.sleep(0.05)
+            if valid_frames > 2:
+                return cap, frame
+        cap.release()
+        time.sleep(1.0)
+    return None, None
+
+
+def _read_commands(state):
+    """stdin command reader; EOF (parent died) also stops the child"""
+    for line in sys.stdin.buffer:
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            continue
+        if msg.get('stop'):
+            break
+        if msg.get('fps'):
+            state['fps'] = float(msg['fps'])
+    state['running'] = False
+
+
+def run_capture(url, width, height, fps):
+    # stdout is the message channel; route stray prints to stderr
+    sys.stdout = sys.stderr
+
+    cap, frame = _open_capture(url, width, height, fps)
+    if cap is None:
+        _emit({'event': 'failed', 'error': 'no frames after 3 attempts'})
+        return 1
+
+    shape = frame.shape
+    size = _HEADER_BYTES + CAPTURE_SLOTS * int(np.prod(shape))
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    seq_arr, timestamps, frames = _map_ring(shm.buf, shape, CAPTURE_SLOTS)
+    seq_arr[0] = 0
+
+    state = {'running': True, 'fps': float(fps)}
+    threading.Thread(target=_read_commands, args=(state,), daemon=True).start()
+    _emit({'event': 'ready', 'shm': shm.name, 'shape': list(shape)})
+
+    seq = 0
+    errors = 0
+    last_frame_time = 0
+    slot = None
+    try:
+        while state['running']:
+            remaining = 1.0 / state['fps'] - (time.time() - last_frame_time)
+            if remaining > 0:
+                time.sleep(remaining)
+
+            # Decode straight into the next slot when the size matches
+            slot = frames[(seq + 1) % CAPTURE_SLOTS]
+            ret, frame = cap.read(slot)
+            if not ret or frame is None:
+                errors += 1
+                _emit({'event': 'error'})
+                if errors > 50:
+                    break
+                time.sleep(0.1)
+                continue
+            errors = 0
+            last_frame_time = time.time()
+
+            if frame is not slot:
+                if frame.shape != slot.shape:
+                    frame = cv2.resize(frame, (shape[1], shape[0]))
+                slot[...] = frame
+            seq += 1
+            timestamps[seq % CAPTURE_SLOTS] = last_frame_time
+            seq_arr[0] = seq
+            _emit({'event': 'frame', 'seq': seq})
+    except OSError:
+        # Parent went away (broken pipe)
+        pass
+    finally:
+        cap.release()
+        # Drop every view into the block before closing it
+        seq_arr = timestamps = frames = slot = frame = None
+        shm.close()
+        shm.unlink()
+    return 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Camera capture child process')
+    parser.add_argument('--url', required=True)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=float, default=30)
+    args = parser.parse_args()
+    code = run_capture(args.url, args.width, args.height, args.fps)
+    sys.stderr.flush()
+    # Skip interpreter shutdown: the stdin reader thread may still be blocked
+    os._exit(code)
@@ -0,0 +1,222 @@
+"""
+FFmpeg Capture
+==============
+Alternative decoder for IP cameras: an ffmpeg subprocess writes frames
+to a pipe as PPM images (a one-line size header + raw RGB), which we read
+straight into preallocated numpy buffers. The header carries the frame
+size, so ffmpeg can keep the source aspect ratio and never upscale.
+
+Compared with cv2.VideoCapture(url) this lets us choose the RTSP transport,
+skip stream probing, disable input buffering/reordering and pin decoder
+threads, and the first frame arrives without a multi-frame warmup.
+
+FFmpegCapture mimics the parts of cv2.VideoCapture that VideoCamera uses.
+"""
+
+import os
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.utils.safe_execution import popen_from_any_thread, wait_process
+
+_rtsp_timeout_options = {}  # ffmpeg path -> RTSP socket timeout option name (or None)
+
+
+def rtsp_timeout_option(ffmpeg_path='ffmpeg'):
+    """
+    Name of the RTSP socket I/O timeout option of this ffmpeg build:
+    '-stimeout' before FFmpeg 5, '-timeout' since. On older builds
+    '-timeout' is a listen timeout that turns on server mode, so the help
+    of the rtsp demuxer is checked once per binary.
+    """
+    if ffmpeg_path not in _rtsp_timeout_options:
+        option = None
+        try:
+            with tempfile.TemporaryFile() as out:
+                proc = popen_from_any_thread([ffmpeg_path, '-hide_banner', '-h', 'demuxer=rtsp'],
+                                             stdin=subprocess.DEVNULL, stdout=out, stderr=subprocess.STDOUT)
+                try:
+                    wait_process(proc, 5.0)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                out.seek(0)
+                help_text = out.read().decode('utf-8', 'replace')
+            if '-stimeout' in help_text:
+                option = '-stimeout'
+            elif '-timeout' in help_text:
+                option = '-timeout'
+        except Exception as e:
+            print(f"[FFmpegCapture] Could not query {ffmpeg_path} options: {e}")
+        _rtsp_timeout_options[ffmpeg_path] = option
+    return _rtsp_timeout_options[ffmpeg_path]
+
+
+def build_ffmpeg_capture_cmd(url, width, height, ffmpeg_path='ffmpeg', rtsp_transport='tcp', decoder_threads=1):
+    """
+    ffmpeg command line: network URL in, low-latency PPM frames on stdout.
+    Frames are fitted inside width x height with the source aspect ratio
+    kept, and never scaled up.
+    """
+    cmd = [
+        ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-nostdin',
+        # Low latency: no input buffering, no B-frame reorder delay, minimal probing
+        '-fflags', 'nobuffer+discardcorrupt', '-flags', 'low_delay',
+        '-probesize', '32768', '-analyzeduration', '0',
+        '-threads', str(decoder_threads),
+    ]
+    # Give up (and exit) on a silent source instead of hanging forever
+    if url.lower().startswith('rtsp'):
+        cmd += ['-rtsp_transport', rtsp_transport]
+        timeout_option = rtsp_timeout_option(ffmpeg_path)
+        if timeout_option:
+            cmd += [timeout_option, '5000000']
+    else:
+        cmd += ['-rw_timeout', '5000000']
+    cmd += [
+        '-i', url,
+        '-an', '-sn',
+        '-vf', f"scale=w='min({width},iw)':h='min({height},ih)':force_original_aspect_ratio=decrease",
+        '-pix_fmt', 'rgb24', '-c:v', 'ppm',
+        '-f', 'image2pipe', 'pipe:1',
+    ]
+    return cmd
+
+
+class FFmpegCapture:
+    """
+    cv2.VideoCapture look-alike reading PPM frames from ffmpeg.
+    Frames are at most width x height (source aspect ratio, no upscaling;
+    the actual size is known from the first frame) and rotate through
+    `buffers` preallocated arrays, so keep buffers larger than the number
+    of frames consumers hold on to.
+    """
+
+    def __init__(self, url, width=1280, height=720, ffmpeg_path='ffmpeg', rtsp_transport='tcp', buffers=12):
+        self.url = str(url)
+        self.width = int(width)
+        self.height = int(height)
+        self.buffer_count = buffers
+        self.buffers = []
+        self._scratch = None  # grab() target
+        self.next_buffer = 0
+        self.proc = None
+        self._reader = None
+
+        cmd = build_ffmpeg_capture_cmd(self.url, self.width, self.height, ffmpeg_path, rtsp_transport)
+        parent_in, child_out = os.pipe()
+        try:
+            self.proc = popen_from_any_thread(cmd, stdin=subprocess.DEVNULL, stdout=child_out)
+            self._reader = os.fdopen(parent_in, 'rb')
+        except Exception as e:
+            print(f"[FFmpegCapture] {self.url} failed to start ffmpeg: {e}")
+            os.close(parent_in)
+        finally:
+            os.close(child_out)
+
+    def isOpened(self):
+        return self.proc is not None and self._reader is not None and self.proc.poll() is None
+
+    def read(self, image=None):
+        """
+        Read the next frame into image (like cv2.VideoCapture.read) or, when
+        image is missing or the wrong size, into the next preallocated buffer.
+        Returns (ret, frame).
+        """
+        if not self._read_header():
+            return False, None
+        if (image is not None and image.shape == self._scratch.shape
+                and image.flags.writeable and image.flags.c_contiguous):
+            frame = image
+        else:
+            frame = self.buffers[self.next_buffer]
+            # Published frames are marked read-only; we own the buffer, so reopen it
+            frame.flags.writeable = True
+            self.next_buffer = (self.next_buffer + 1) % len(self.buffers)
+        if not self._read_pixels(frame):
+            return False, None
+        cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=frame)
+        return True, frame
+
+    def grab(self):
+        """Read and discard the next frame (keeps the pipe current while throttled)"""
+        return self._read_header() and self._read_pixels(self._scratch)
+
+    def _read_header(self):
+        """
+        Parse the next PPM header (lines "P6", "<width> <height>", "255") and
+        (re)allocate the buffers when the frame size changes.
+        """
+        if self._reader is None:
+            return False
+        try:
+            magic = self._reader.readline(16).strip()
+            width, height = (int(v) for v in self._reader.readline(32).split())
+            maxval = int(self._reader.readline(16))
+        except (OSError, ValueError):
+            # ffmpeg exited (stream ended, timeout or bad URL) or sent garbage
+            self._close_reader()
+            return False
+        if magic != b'P6' or maxval != 255 or width <= 0 or height <= 0:
+            self._close_reader()
+            return False
+
+        shape = (height, width, 3)
+        if self._scratch is None or self._scratch.shape != shape:
+            self.width, self.height = width, height
+            # Frames already handed out keep their own arrays
+            self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.buffer_count)]
+            self._scratch = np.empty(shape, dtype=np.uint8)
+            self.next_buffer = 0
+        return True
+
+    def _read_pixels(self, frame):
+        view = memoryview(frame).cast('B')
+        frame_bytes = len(view)
+        filled = 0
+        try:
+            while filled < frame_bytes:
+                n = self._reader.readinto(view[filled:])
+                if not n:
+                    # ffmpeg exited mid-frame
+                    self._close_reader()
+                    return False
+                filled += n
+        except (OSError, ValueError, AttributeError):
+            self._close_reader()
+            return False
+        finally:
+            view.release()
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def set(self, prop, value):
+        """Size/FPS are fixed on the ffmpeg command line"""
+        return False
+
+    def _close_reader(self):
+        try:
+            if self._reader:
+                self._reader.close()
+        except Exception:
+            pass
+        self._reader = None
+
+    def release(self, timeout=3.0):
+        self._close_reader()
+        if self.proc:
+            if self.proc.poll() is None:
+                self.proc.terminate()
+            try:
+                wait_process(self.proc, timeout)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+            self.proc = None
@@ -0,0 +1,175 @@
+"""
+Finalization Service
+====================
+Background job queue that finishes stopped recordings (encoder flush,
+SHA-256 metadata, thumbnail, DB commit) so stop returns immediately.
+
+Jobs are persisted through the record status: anything left in
+FINALIZING after a restart is re-queued by recover_pending(). A record is
+only marked COMPLETED when its video opens and yields a frame (a leftover
+MJPEG intermediate is converted again), otherwise it ends as ERROR.
+"""
+
+import queue
+import threading
+import time
+from app.utils.logger import video_logger
+
+
+FINALIZE_STAGES = ('capture', 'metadata', 'thumbnail', 'commit')
+
+
+class FinalizationQueue:
+    """Queue + worker threads for recording finalization jobs"""
+    
+    def __init__(self, workers=2):
+        self.jobs = queue.Queue()
+        self.workers = workers
+        self.app = None
+        self.running = False
+        self.worker_threads = []
+        # recording_id -> last completed stage (for status polling)
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+    
+    def start(self, app):
+        """Start worker threads (needs the Flask app for DB access)"""
+        if self.running:
+            print("[Finalize] Already running")
+            return
+        
+        self.app = app
+        self.running = True
+        
+        from app.utils.safe_execution import safe_thread_loop
+        
+        @safe_thread_loop("FinalizeWorker", interval=0)
+        def _safe_worker():
+            job = self.jobs.get()
+            try:
+                self._process(job)
+            finally:
+                self.jobs.task_done()
+        
+        for _ in range(self.workers):
+            t = threading.Thread(target=_safe_worker, daemon=True)
+            t.start()
+            self.worker_threads.append(t)
+        print(f"[Finalize] Started {self.workers} worker(s)")
+    
+    def enqueue(self, job):
+        """Queue a job dict (recording_id, db_id, output_path, save_video, thread)"""
+        job.setdefault('queued_at', time.time())
+        with self.pending_lock:
+            self.pending[job.get('recording_id')] = 'queued'
+        self.jobs.put(job)
+        self._emit('recording_finalize_progress', {
+            'recording_id': job.get('recording_id'),
+            'db_id': job.get('db_id'),
+            'stage': 'queued',
+            'stage_index': 0,
+            'stage_count': len(FINALIZE_STAGES),
+            'queue_depth': self.jobs.qsize()
+        })
+    
+    def recover_pending(self):
+        """Re-queue records left in FINALIZING by a previous run (app context required)"""
+        from app.models import PackingRecord
+        
+        try:
+            records = PackingRecord.query.filter_by(status='FINALIZING').all()
+        except Exception as e:
+            print(f"[Finalize] Recovery skipped: {e}")
+            return 0
+        
+        for record in records:
+            self.enqueue({
+                'recording_id': f"rec_{record.id}_recovered",
+                'db_id': record.id,
+                'output_path': record.file_video,
+                'save_video': True,
+                'thread': None
+            })
+        
+        if records:
+            print(f"[Finalize] Recovered {len(records)} unfinished job(s)")
+        return len(records)
+    
+    def get_status(self, recording_id):
+        """Last completed stage for a recording, or None if not queued"""
+        with self.pending_lock:
+            return self.pending.get(recording_id)
+    
+    def _process(self, job):
+        from app.models import db, PackingRecord
+        from app.services.recording_service import RecordingService
+        
+        recording_id = job.get('recording_id')
+        started = time.time()
+        
+        def report(stage):
+            with self.pending_lock:
+                self.pending[recording_id] = stage
+            self._emit('recording_finalize_progress', {
+                'recording_id': recording_id,
+                'db_id': job.get('db_id'),
+                'stage': stage,
+                'stage_index': FINALIZE_STAGES.index(stage) + 1,
+                'stage_count': len(FINALIZE_STAGES),
+                'elapsed': round(time.time() - started, 2)
+            })
+        
+        with self.app.app_context():
+            recording_service = RecordingService(db, PackingRecord)
+            try:
+                result = recording_service.finalize_recording(job, report=report)
+            except Exception as e:
+                video_logger.error(f"Finalization failed for {recording_id}: {e}", exc_info=True)
+                db.session.rollback()
+                self._mark_error(job, str(e))
+                result = {'recording_id': recording_id, 'db_id': job.get('db_id'), 'status': 'ERROR', 'error': str(e)}
+            
+            with self.pending_lock:
+                self.pending.pop(recording_id, None)
+            
+            if result is None:
+                return
+            
+            result['queue_wait'] = round(started - job.get('queued_at', started), 2)
+            result['elapsed'] = round(time.time() - started, 2)
+            video_logger.info(f"Finalized recording {recording_id}", extra={'context': result})
+            self._emit('recording_finalized', result)
+            
+            try:
+                self._emit('status_update', recording_service.get_recording_status())
+            except Exception as e:
+                print(f"[Finalize] Status broadcast failed: {e}")
+    
+    def _mark_error(self, job, message):
+        from app.models import db, PackingRecord
+        try:
+            record = PackingRecord.query.get(job.get('db_id'))
+            if record:
+                record.status = 'ERROR'
+                record.error_message = f"Finalization failed: {message}"
+                db.session.commit()
+        except Exception as e:
+            print(f"[Finalize] Could not mark error: {e}")
+            db.session.rollback()
+    
+    def _emit(self, event, data):
+        try:
+            from app import socketio
+            if socketio:
+                socketio.emit(event, data)
+        except Exception as e:
+            print(f"[Finalize] Emit {event} failed: {e}")
+
+
+# Global instance
+finalization_queue = FinalizationQueue()
+
+
+def start_finalization_worker(app):
+    """Start the global finalization queue"""
+    finalization_queue.start(app)
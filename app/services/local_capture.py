@@ -0,0 +1,233 @@
+"""
+Local Capture
+=============
+Opening USB/built-in cameras with the right OpenCV backend for the OS:
+- Windows: DirectShow, then Media Foundation
+- Linux:   V4L2 with an MJPG pixel format negotiated at the configured
+           size/fps (uncompressed YUYV cannot carry 720p30 over USB 2.0)
+- other:   OpenCV's default backend
+
+On Linux V4L2MJPEGCapture can also hand out the camera's compressed JPEGs
+before any decode (same JPEGCapture interface as MJPEGCapture),
+so preview viewers get them without a decode + re-encode.
+
+Enumeration: on Linux /dev/video* nodes are listed with their V4L2
+capabilities without opening a stream; elsewhere there is no OS listing
+and callers probe indices (see camera_service.detect_local_cameras).
+"""
+
+import glob
+import os
+import platform
+import struct
+
+import cv2
+import numpy as np
+
+from app.services.mjpeg_capture import JPEG_SOI, JPEGCapture
+
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
+
+
+def local_capture_backends():
+    """(name, OpenCV API preference) pairs for local cameras, best first"""
+    system = platform.system()
+    if system == 'Windows':
+        return [("DirectShow", cv2.CAP_DSHOW), ("Media Foundation", cv2.CAP_MSMF)]
+    if system == 'Linux':
+        return [("V4L2", cv2.CAP_V4L2)]
+    return [("Default", cv2.CAP_ANY)]
+
+
+def negotiate_mjpeg(cap, width, height, fps):
+    """
+    Ask a V4L2 device for MJPG at width x height @ fps. The pixel format must
+    be set before the size, otherwise the driver picks sizes for YUYV.
+
+    Returns:
+        bool: True if the device is now delivering MJPG
+    """
+    cap.set(cv2.CAP_PROP_FOURCC, MJPG_FOURCC)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    return int(cap.get(cv2.CAP_PROP_FOURCC)) == MJPG_FOURCC
+
+
+def open_local_capture(index, backend, width, height, fps, passthrough=False):
+    """
+    Open local camera `index` with one backend (see local_capture_backends).
+    On V4L2 the device is switched to MJPG; with passthrough the JPEGs are
+    kept compressed (V4L2MJPEGCapture) when the device supports it.
+
+    Returns:
+        An opened capture, or None
+    """
+    if backend == cv2.CAP_V4L2 and passthrough:
+        cap = V4L2MJPEGCapture(index, width, height, fps)
+        if cap.isOpened():
+            return cap
+        cap.release()
+
+    cap = cv2.VideoCapture(index, backend)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    if backend == cv2.CAP_V4L2 and not negotiate_mjpeg(cap, width, height, fps):
+        print(f"[LocalCapture] Camera {index}: no MJPG mode, using the device default format")
+    return cap
+
+
+# ============================================
+# DEVICE LISTING (V4L2)
+# ============================================
+
+VIDIOC_QUERYCAP = 0x80685600  # _IOR('V', 0, struct v4l2_capability), 104 bytes
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+def _query_capabilities(path):
+    """
+    VIDIOC_QUERYCAP on a V4L2 node (works while another process streams).
+
+    Returns:
+        Tuple of (card name, capability flags of this node), or None
+    """
+    import fcntl  # Unix only
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        caps = bytearray(104)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, caps)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    card = bytes(caps[16:48]).split(b'\0', 1)[0].decode('utf-8', 'replace')
+    capabilities, device_caps = struct.unpack_from('<II', caps, 84)
+    return card, device_caps if capabilities & V4L2_CAP_DEVICE_CAPS else capabilities
+
+
+def list_video_devices():
+    """
+    Local cameras known to the OS, without opening a stream. Only V4L2
+    nodes that can capture video count (a UVC camera also exposes a
+    metadata node, which is skipped).
+
+    Returns:
+        List of {'index', 'name', 'device'}, or None when the OS has no
+        device listing (indices have to be probed)
+    """
+    if platform.system() != 'Linux':
+        return None
+    devices = []
+    for path in glob.glob('/dev/video[0-9]*'):
+        suffix = path[len('/dev/video'):]
+        if not suffix.isdigit():
+            continue
+        caps = _query_capabilities(path)
+        if caps is None or not caps[1] & V4L2_CAP_VIDEO_CAPTURE:
+            continue
+        index = int(suffix)
+        devices.append({'index': index, 'name': caps[0] or f'Local Camera {index}', 'device': path})
+    return sorted(devices, key=lambda d: d['index'])
+
+
+def video_device_signature():
+    """
+    Cheap hotplug check: the set of /dev/video* nodes (None where the OS
+    has no device listing). A change means a camera was added or removed.
+    """
+    if platform.system() != 'Linux':
+        return None
+    try:
+        return tuple(sorted(name for name in os.listdir('/dev') if name.startswith('video')))
+    except OSError:
+        return None
+
+
+# ============================================
+# JPEG PASSTHROUGH (V4L2)
+# ============================================
+
+def _standard_huffman_tables():
+    """
+    DHT segments with the standard Huffman tables (JPEG Annex K), taken from
+    a baseline JPEG written by OpenCV's libjpeg.
+    """
+    ok, encoded = cv2.imencode('.jpg', np.zeros((8, 8, 3), dtype=np.uint8))
+    data = encoded.tobytes() if ok else b''
+    tables = b''
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF and data[pos + 1] != 0xDA:
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        if data[pos + 1] == 0xC4:
+            tables += data[pos:pos + 2 + length]
+        pos += 2 + length
+    return tables
+
+STANDARD_HUFFMAN_TABLES = _standard_huffman_tables()
+
+
+def with_huffman_tables(jpeg):
+    """
+    Many USB cameras send MJPEG frames without DHT segments (decoders are
+    expected to assume the standard tables); browsers do not, so insert
+    them before the start of scan when missing.
+    """
+    pos = 2
+    while pos + 4 <= len(jpeg) and jpeg[pos] == 0xFF:
+        marker = jpeg[pos + 1]
+        if marker == 0xC4:
+            return jpeg
+        if marker == 0xDA:
+            return jpeg[:pos] + STANDARD_HUFFMAN_TABLES + jpeg[pos:]
+        pos += 2 + int.from_bytes(jpeg[pos + 2:pos + 4], 'big')
+    return jpeg
+
+
+class V4L2MJPEGCapture(JPEGCapture):
+    """
+    V4L2 camera delivering its MJPG frames undecoded (CAP_PROP_CONVERT_RGB
+    off): grab() keeps the JPEG, retrieve()/read() decode it when pixels are
+    needed. isOpened() is False when the device has no MJPG mode.
+    """
+
+    def __init__(self, index, width, height, fps):
+        self.index = index
+        self.jpeg = None  # Last grabbed JPEG (bytes), not decoded
+        self.cap = cv2.VideoCapture(index, cv2.CAP_V4L2)
+        self.compressed = False
+        if self.cap.isOpened() and negotiate_mjpeg(self.cap, width, height, fps):
+            self.compressed = bool(self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+
+    def isOpened(self):
+        return self.compressed and self.cap.isOpened()
+
+    def grab(self):
+        """Read the next JPEG without decoding it"""
+        if not self.cap.grab():
+            return False
+        ret, raw = self.cap.retrieve()
+        if not ret or raw is None or raw.size < 4:
+            return False
+        jpeg = raw.tobytes()
+        if not jpeg.startswith(JPEG_SOI):
+            return False
+        self.jpeg = with_huffman_tables(jpeg)
+        return True
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        # Decoding on the driver side would end the passthrough
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            return False
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
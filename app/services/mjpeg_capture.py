@@ -0,0 +1,200 @@
+"""
+MJPEG Capture
+=============
+Passthrough reader for HTTP MJPEG sources (DroidCam .../mjpegfeed,
+IP Webcam .../video): the multipart/x-mixed-replace stream is parsed
+directly and every part's JPEG is kept as-is, so preview viewers can be
+served the device's own JPEG without a decode + re-encode.
+
+grab() only reads the next JPEG; retrieve()/read() decode it to a BGR frame
+for consumers that need pixels (recorder, barcode scanner).
+
+MJPEGCapture mimics the parts of cv2.VideoCapture that VideoCamera uses.
+JPEGCapture is the grab()/.jpeg/retrieve() interface it shares with
+local_capture.V4L2MJPEGCapture.
+"""
+
+import base64
+import urllib.request
+from urllib.parse import urlsplit, urlunsplit
+
+import cv2
+import numpy as np
+
+JPEG_SOI = b'\xff\xd8'
+MAX_PART_BYTES = 8 * 1024 * 1024  # a part larger than this is a broken stream
+
+
+def is_mjpeg_candidate(url):
+    """HTTP(S) sources may be MJPEG; the Content-Type decides (see MJPEGCapture)"""
+    return str(url).lower().startswith(('http://', 'https://'))
+
+
+class JPEGCapture:
+    """
+    Base for captures that hand out the source's JPEG before decoding it:
+    grab() keeps it in .jpeg (implemented by subclasses), retrieve()/read()
+    decode it for consumers that need pixels.
+    """
+    jpeg = None  # Last grabbed JPEG (bytes), not decoded
+
+    def grab(self):
+        raise NotImplementedError
+
+    def retrieve(self, image=None):
+        """Decode the last grabbed JPEG. Returns (ret, frame)."""
+        if self.jpeg is None:
+            return False, None
+        frame = cv2.imdecode(np.frombuffer(self.jpeg, np.uint8), cv2.IMREAD_COLOR)
+        return (frame is not None), frame
+
+    def read(self, image=None):
+        """grab() + retrieve(). Frames are decoded into new arrays (image is ignored)."""
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+
+class MJPEGCapture(JPEGCapture):
+    """
+    cv2.VideoCapture look-alike over an HTTP multipart MJPEG stream.
+    isOpened() is False when the URL does not answer with a multipart
+    stream, so callers can fall back to another backend.
+    """
+
+    def __init__(self, url, timeout=5.0):
+        self.url = str(url)
+        self.jpeg = None  # Last grabbed JPEG (bytes), not decoded
+        self.width = 0
+        self.height = 0
+        self._response = None
+        self._boundary = None
+        self._open(timeout)
+
+    def _open(self, timeout):
+        # urllib does not take credentials from the URL: send them as Basic auth
+        parts = urlsplit(self.url)
+        headers = {}
+        url = self.url
+        if parts.username:
+            credentials = f"{parts.username}:{parts.password or ''}".encode()
+            headers['Authorization'] = 'Basic ' + base64.b64encode(credentials).decode()
+            netloc = parts.hostname + (f":{parts.port}" if parts.port else '')
+            url = urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+        try:
+            response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+        except Exception as e:
+            print(f"[MJPEGCapture] {self.url} failed to connect: {e}")
+            return
+
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.lower().startswith('multipart/'):
+            response.close()
+            return
+        for param in content_type.split(';')[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'boundary':
+                value = value.strip().strip('"')
+                self._boundary = value if value.startswith('--') else '--' + value
+        self._boundary = (self._boundary or '--').encode()
+        self._response = response
+
+    def isOpened(self):
+        return self._response is not None
+
+    def grab(self):
+        """Read the next JPEG without decoding it"""
+        jpeg = self._next_part()
+        if jpeg is None:
+            return False
+        self.jpeg = jpeg
+        return True
+
+    def retrieve(self, image=None):
+        """Decode the last grabbed JPEG (the size is only known from a decode)"""
+        ret, frame = super().retrieve(image)
+        if ret:
+            self.height, self.width = frame.shape[:2]
+        return ret, frame
+
+    def _next_part(self):
+        """Next JPEG part (anything else, e.g. text keep-alives, is skipped)"""
+        while True:
+            data = self._read_part()
+            if data is None or data.startswith(JPEG_SOI):
+                return data
+
+    def _read_part(self):
+        """
+        Body of the next multipart part. Uses Content-Length when the device
+        sends it, otherwise reads up to the next boundary line.
+        """
+        fp = self._response
+        if fp is None:
+            return None
+        try:
+            # Part headers (the boundary line and blank lines before them are skipped)
+            length = None
+            in_headers = False
+            while True:
+                line = fp.readline(1024)
+                if not line:
+                    return self._fail()
+                line = line.strip()
+                if not line:
+                    if in_headers:
+                        break
+                    continue
+                if line.startswith(self._boundary):
+                    continue
+                in_headers = True
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value.strip())
+
+            if length is not None:
+                if not 0 < length <= MAX_PART_BYTES:
+                    return self._fail()
+                data = fp.read(length)
+                if len(data) < length:
+                    return self._fail()
+            else:
+                chunks = []
+                size = 0
+                while True:
+                    line = fp.readline(65536)
+                    if not line:
+                        return self._fail()
+                    if line.startswith(self._boundary):
+                        break
+                    chunks.append(line)
+                    size += len(line)
+                    if size > MAX_PART_BYTES:
+                        return self._fail()
+                data = b''.join(chunks).rstrip(b'\r\n')
+        except (OSError, ValueError):
+            return self._fail()
+        return data
+
+    def _fail(self):
+        self.release()
+        return None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return 0.0
+
+    def set(self, prop, value):
+        """Size/FPS/quality are chosen on the device"""
+        return False
+
+    def release(self):
+        try:
+            if self._response is not None:
+                self._response.close()
+        except Exception:
+            pass
+        self._response = None
@@ -13,8 +13,12 @@ from app.models import db, PackingRecord
 from app.utils import create_recording_folder, generate_metadata_json
 import os
 import cv2
+import numpy as np
 import subprocess
+import tempfile
+import config
 from app.utils.logger import video_logger, audit_logger, get_trace_id
+from app.utils.safe_execution import popen_from_any_thread, wait_process
 
 # [ANTIGRAVITY] GEVENT THREADPOOL
 import gevent
@@ -22,6 +26,392 @@ from gevent.threadpool import ThreadPool
 # current_app removed as it was only for auto-stop monitor
 
 _rec_pool = ThreadPool(10) # 10 threads for recording writes
+_finalize_pool = ThreadPool(2) # Hashing / thumbnails for finalization jobs
+
+
+def _popen_low_priority(cmd, stdin_pipe=False):
+    """
+    Start an FFmpeg process with lower scheduling priority on Windows.
+    Works from _rec_pool threads (see app.utils.safe_execution): stdin is a
+    plain OS pipe and stderr is collected in a temporary file (_read_stderr).
+    
+    Returns:
+        Tuple of (process, stdin writer or None, stderr file)
+    """
+    import sys
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    
+    stderr_file = tempfile.TemporaryFile()
+    read_fd = write_fd = None
+    if stdin_pipe:
+        read_fd, write_fd = os.pipe()
+    try:
+        process = popen_from_any_thread(
+            cmd,
+            stdin=read_fd if stdin_pipe else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr_file,
+            **kwargs
+        )
+    except Exception:
+        stderr_file.close()
+        if write_fd is not None:
+            os.close(write_fd)
+        raise
+    finally:
+        if read_fd is not None:
+            os.close(read_fd)
+    stdin = os.fdopen(write_fd, 'wb') if stdin_pipe else None
+    return process, stdin, stderr_file
+
+
+def _read_stderr(stderr_file):
+    """FFmpeg's error output from the temporary file of _popen_low_priority"""
+    try:
+        stderr_file.seek(0)
+        return stderr_file.read().decode('utf-8', errors='ignore')
+    except Exception:
+        return ''
+    finally:
+        stderr_file.close()
+
+
+def _mjpeg_transcode_cmd(temp_path, output_path):
+    """FFmpeg command converting the MJPEG intermediate (.avi) to H.264 MP4"""
+    # FFmpeg command - OPTIMIZED for speed and lower resource usage
+    # CRF 26 = Good quality, smaller files (was 23)
+    # preset veryfast = 3x faster encoding (was medium)
+    # threads 2 = Limit CPU usage
+    # max_muxing_queue_size = Prevent buffer overflow
+    return [
+        config.FFMPEG_PATH, '-y',
+        '-i', temp_path,
+        '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',  # Force even dimensions
+        '-c:v', 'libx264',
+        '-preset', 'veryfast',  # Faster encoding
+        '-crf', '26',  # Lower quality = smaller files, still good
+        '-pix_fmt', 'yuv420p',
+        '-movflags', '+faststart',
+        '-threads', '2',  # Limit CPU usage
+        '-max_muxing_queue_size', '1024',  # Prevent buffer overflow
+        output_path
+    ]
+
+
+def _has_video(path):
+    """True if path is an existing, non-empty file"""
+    try:
+        return bool(path) and os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+def _is_playable(path):
+    """
+    True if the video opens and yields a frame. An MP4 whose encoder was cut
+    off (restart during pipe/copy recording) is non-empty but has no index
+    (moov atom) and fails here.
+    """
+    if not _has_video(path):
+        return False
+    cap = cv2.VideoCapture(path)
+    try:
+        ret, frame = cap.read() if cap.isOpened() else (False, None)
+        return bool(ret) and frame is not None
+    finally:
+        cap.release()
+
+
+def _recover_video_output(output_path, timeout=120.0):
+    """
+    Make sure a stopped recording has a playable final video before it is
+    marked COMPLETED. A restart in the middle of the MJPEG conversion can
+    leave only the .avi intermediate: it is converted again here.
+    
+    Returns:
+        bool: True if output_path opens and yields a frame
+    """
+    if _is_playable(output_path):
+        return True
+    temp_path = str(output_path).replace('.mp4', '.avi') if output_path else None
+    if not temp_path or temp_path == output_path or not _has_video(temp_path):
+        return False
+    
+    print(f"[Recording] Output missing or unplayable, converting leftover intermediate: {temp_path}")
+    process, _, stderr_file = _popen_low_priority(_mjpeg_transcode_cmd(temp_path, output_path))
+    try:
+        returncode = wait_process(process, timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        returncode = None
+    error_msg = _read_stderr(stderr_file)
+    
+    if returncode == 0 and _is_playable(output_path):
+        print(f"[Recording] ✅ Recovered {output_path}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return True
+    print(f"[Recording] ❌ Recovery conversion FAILED (code {returncode}):\n{error_msg}")
+    return False
+
+
+# ============================================
+# FFMPEG PIPE WRITER
+# ============================================
+
+class FFmpegPipeWriter:
+    """
+    Live H.264 writer: raw BGR frames are piped into a long-lived FFmpeg
+    process while recording, so the MP4 is finished right after stop.
+    Exposes the subset of cv2.VideoWriter used by the recording loop.
+    """
+    
+    def __init__(self, output_path, fps, frame_size, ffmpeg_path='ffmpeg'):
+        self.output_path = output_path
+        self.width, self.height = frame_size
+        self.process = None
+        self.stdin = None
+        self.stderr_file = None
+        self.failed = False
+        
+        cmd = [
+            ffmpeg_path, '-y',
+            '-loglevel', 'error', '-nostats',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-s', f"{self.width}x{self.height}",
+            '-r', str(fps),
+            '-i', '-',
+            '-an',
+            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',  # Force even dimensions
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-crf', '26',
+            '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',
+            '-threads', '2',  # Limit CPU usage
+            output_path
+        ]
+        
+        try:
+            self.process, self.stdin, self.stderr_file = _popen_low_priority(cmd, stdin_pipe=True)
+            print(f"[Recording] FFmpeg pipe started: {' '.join(cmd)}")
+        except Exception as e:
+            video_logger.error(f"Failed to start FFmpeg pipe: {e}")
+            self.process = None
+    
+    def isOpened(self):
+        return self.process is not None and not self.failed and self.process.poll() is None
+    
+    def write(self, frame):
+        """Send one BGR frame to FFmpeg (resized if the camera resolution changed)"""
+        if not self.isOpened():
+            return False
+        
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv2.resize(frame, (self.width, self.height))
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        
+        try:
+            self.stdin.write(frame.data)
+            return True
+        except (BrokenPipeError, OSError, ValueError) as e:
+            print(f"[Recording] ❌ FFmpeg pipe closed unexpectedly: {e}")
+            self.failed = True
+            return False
+    
+    def close(self, timeout=30):
+        """
+        Close stdin and wait for FFmpeg to flush and finalize the MP4.
+        
+        Returns:
+            True if FFmpeg exited cleanly
+        """
+        if self.process is None:
+            return False
+        
+        try:
+            self.stdin.close()
+        except Exception:
+            pass
+        
+        try:
+            wait_process(self.process, timeout)
+        except subprocess.TimeoutExpired:
+            print(f"[Recording] ❌ FFmpeg finalize timeout (>{timeout}s), killing process")
+            self.process.kill()
+            wait_process(self.process, 5.0)
+        
+        error_msg = _read_stderr(self.stderr_file)
+        
+        if self.process.returncode != 0:
+            print(f"[Recording] ❌ FFmpeg pipe FAILED (code {self.process.returncode})")
+            print(f"[Recording] Error Output:\n{error_msg}")
+            return False
+        return True
+    
+    def release(self):
+        """cv2.VideoWriter compatibility"""
+        self.close()
+
+
+# ============================================
+# FFMPEG STREAM COPY RECORDER
+# ============================================
+
+STREAM_COPY_RETRY_DELAY = 2.0  # seconds before restarting a remux that exited mid-session
+
+
+class FFmpegStreamCopyRecorder:
+    """
+    Remuxes an RTSP camera's own H.264 stream into MP4 with '-c copy'.
+    No decode and no re-encode, so recording costs almost no CPU.
+    """
+    
+    def __init__(self, output_path, source_url, ffmpeg_path='ffmpeg', rtsp_transport='tcp'):
+        self.output_path = output_path
+        self.source_url = source_url
+        self.ffmpeg_path = ffmpeg_path
+        self.rtsp_transport = rtsp_transport
+        self.process = None
+        self.stdin = None
+        self.stderr_file = None
+    
+    def start(self, startup_timeout=5.0):
+        """
+        Launch FFmpeg and wait until it has opened the camera and created the output.
+        
+        Returns:
+            True if the remux is running
+        """
+        cmd = [
+            self.ffmpeg_path, '-y',
+            '-loglevel', 'error', '-nostats',
+            '-rtsp_transport', self.rtsp_transport,
+            '-i', self.source_url,
+            '-map', '0:v:0',
+            '-c', 'copy',
+            '-an',
+            '-avoid_negative_ts', 'make_zero',
+            '-movflags', '+faststart',
+            self.output_path
+        ]
+        
+        try:
+            self.process, self.stdin, self.stderr_file = _popen_low_priority(cmd, stdin_pipe=True)
+        except Exception as e:
+            video_logger.error(f"Failed to start FFmpeg stream copy: {e}")
+            return False
+        
+        # FFmpeg writes the MP4 header once the RTSP stream is opened and probed
+        deadline = time.time() + startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                self._log_failure()
+                return False
+            if os.path.exists(self.output_path):
+                break
+            time.sleep(0.1)
+        
+        return self.is_alive()
+    
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def stop(self, timeout=10.0):
+        """
+        Ask FFmpeg to quit ('q') so it writes the moov atom, then wait for it.
+        
+        Returns:
+            True if FFmpeg exited cleanly
+        """
+        if self.process is None:
+            return False
+        
+        if self.process.poll() is None:
+            try:
+                self.stdin.write(b'q')
+                self.stdin.flush()
+                self.stdin.close()
+            except Exception:
+                pass
+            
+            try:
+                wait_process(self.process, timeout)
+            except subprocess.TimeoutExpired:
+                print(f"[Recording] ❌ FFmpeg stream copy did not quit in {timeout}s, terminating")
+                self.process.terminate()
+                try:
+                    wait_process(self.process, 3.0)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    wait_process(self.process, 5.0)
+        
+        if self.process.returncode != 0:
+            self._log_failure()
+            return False
+        self.stderr_file.close()
+        return True
+    
+    def _log_failure(self):
+        try:
+            self.stdin.close()
+        except Exception:
+            pass
+        error_msg = _read_stderr(self.stderr_file)
+        print(f"[Recording] ❌ FFmpeg stream copy FAILED (code {self.process.returncode})")
+        print(f"[Recording] Error Output:\n{error_msg}")
+
+
+def _join_segments(segments, output_path, timeout=120.0):
+    """
+    Join stream-copy segments (same camera, same codec) into output_path
+    without re-encoding. The first segment is output_path itself.
+    
+    Returns:
+        True if output_path now holds the whole recording
+    """
+    if len(segments) < 2:
+        return bool(segments)
+    
+    joined_path = str(output_path).replace('.mp4', '_joined.mp4')
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as list_file:
+        for path in segments:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+    cmd = [
+        config.FFMPEG_PATH, '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_file.name,
+        '-c', 'copy', '-movflags', '+faststart',
+        joined_path
+    ]
+    try:
+        process, _, stderr_file = _popen_low_priority(cmd)
+        try:
+            returncode = wait_process(process, timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            returncode = None
+        error_msg = _read_stderr(stderr_file)
+    finally:
+        os.remove(list_file.name)
+    
+    if returncode == 0 and _is_playable(joined_path):
+        os.replace(joined_path, output_path)
+        for path in segments[1:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        print(f"[Recording] ✅ Joined {len(segments)} stream copy segments into {output_path}")
+        return True
+    print(f"[Recording] ❌ Joining stream copy segments FAILED (code {returncode}), kept {segments[1:]}:\n{error_msg}")
+    return False
 
 
 # ============================================
@@ -97,14 +487,91 @@ class RecordingService:
             video_logger.error(f"Error marking zombie: {e}")
             self.db.session.rollback()
     
+    def _record_stream_copy(self, recording_id, camera_url, output_path, stop_event):
+        """
+        Record by remuxing the camera's RTSP stream until stop_event is set.
+        If FFmpeg exits mid-session (RTSP blip) the remux is restarted into a
+        new segment; segments are joined (stream copy) after stop.
+        
+        Returns:
+            False if nothing has been recorded and the session is still running
+            (caller falls back to frame recording)
+        """
+        segments = []  # playable files, output_path first
+        
+        while not stop_event.is_set():
+            path = output_path if not segments else str(output_path).replace('.mp4', f'_part{len(segments) + 1}.mp4')
+            recorder = FFmpegStreamCopyRecorder(
+                path, camera_url,
+                ffmpeg_path=config.FFMPEG_PATH,
+                rtsp_transport=getattr(config, 'RTSP_TRANSPORT', 'tcp')
+            )
+            if not recorder.start():
+                if not segments:
+                    return False
+                # Camera still down: keep trying until the operator stops
+                stop_event.wait(STREAM_COPY_RETRY_DELAY)
+                continue
+            
+            video_logger.info(f"Stream copy recording started", extra={'context': {'rec_id': recording_id, 'path': path}})
+            while not stop_event.is_set() and recorder.is_alive():
+                time.sleep(0.1)
+            unexpected = not stop_event.is_set()
+            
+            recorder.stop()
+            if _is_playable(path):
+                segments.append(path)
+            elif os.path.exists(path):
+                os.remove(path)
+            
+            if unexpected:
+                video_logger.error(f"Stream copy stopped unexpectedly", extra={'context': {'rec_id': recording_id, 'segments': len(segments)}})
+                if not segments:
+                    return False
+                stop_event.wait(STREAM_COPY_RETRY_DELAY)
+        
+        if not segments:
+            print(f"[Recording] ❌ Stream copy did not produce {output_path}")
+        elif _join_segments(segments, output_path):
+            file_size = os.path.getsize(output_path)
+            print(f"[Recording] ✅ Final file ready (stream copy): {output_path} ({file_size} bytes, {len(segments)} segment(s))")
+        return True
+    
     def _record_video_thread(self, recording_id, camera_url, output_path, stop_event):
         """
         Background thread for video recording.
         """
+        from app.services.camera_service import recording_stream_url
+        
+        # Always record the main stream, even if the client sent a paired sub-stream URL
+        camera_url = recording_stream_url(camera_url)
         video_logger.info(f"Thread STARTED for {recording_id}", extra={'context': {'camera': camera_url}})
         
         # Temp file for MJPEG recording
         temp_path = str(output_path).replace('.mp4', '.avi')
+        recording_mode = getattr(config, 'RECORDING_MODE', 'pipe')
+        
+        # Stream copy only applies to RTSP cameras; local/MJPEG sources use the frame path
+        if recording_mode == 'copy' and str(camera_url).lower().startswith('rtsp'):
+            try:
+                if self._record_stream_copy(recording_id, camera_url, output_path, stop_event):
+                    return
+            except Exception as e:
+                video_logger.error(f"Stream copy error: {e}", exc_info=True)
+            video_logger.warning(f"Stream copy unavailable, falling back to frame recording", extra={'context': {'rec_id': recording_id}})
+        
+        camera = None
+        
+        def release_recording_camera():
+            """Paired camera: the main stream was opened for this recording only"""
+            if camera is None:
+                return
+            try:
+                from app.services.camera_service import retire_recording_camera
+                camera.frames.forget(f"recorder:{recording_id}")
+                retire_recording_camera(camera_url)
+            except Exception as e:
+                print(f"[Recording] Could not release the recording camera: {e}")
         
         try:
             import traceback
@@ -112,134 +579,140 @@ class RecordingService:
             from app.services.camera_service import get_camera_stream
             
             # Wait for camera
-            camera = get_camera_stream(camera_url)
+            camera = get_camera_stream(camera_url, purpose='record')
             retries = 0
             while not camera and retries < 5:
                 time.sleep(0.5)
-                camera = get_camera_stream(camera_url)
+                camera = get_camera_stream(camera_url, purpose='record')
                 retries += 1
                 
             if not camera:
                 video_logger.error(f"Thread abort: Camera {camera_url} unavailable")
                 return
 
-            # Wait for first frame
+            # Register as a recorder so the camera switches to its recording
+            # profile, then size the writer from a frame captured after the switch
+            camera.frames_since(camera.frames.seq, consumer=f"recorder:{recording_id}")
+            camera.adapt()
+            camera.wait_for_frame(camera.frames.seq + 1, timeout=2.0)
             frame = camera.get_raw_frame()
-            wait_frame = 0
-            while frame is None and wait_frame < 20:
-                time.sleep(0.1)
-                frame = camera.get_raw_frame()
-                wait_frame += 1
             
             if frame is None:
                 video_logger.error(f"Thread abort: No frame received")
                 return
 
             h, w = frame.shape[:2]
-            fps = 30.0  # MATCH CAMERA FPS for 1:1 capture
+            fps = float(config.VIDEO_FPS)  # Output rate; capture rate may be lower under load
             
-            # MJPEG Writer (100% reliable in OpenCV)
-            fourcc = cv2.VideoWriter_fourcc(*'MJPG')
-            # [ANTIGRAVITY] Direct Blocking Init (Safe in Worker Thread)
-            out = cv2.VideoWriter(temp_path, fourcc, fps, (w, h))
+            # Live H.264 pipe (default): MP4 is ready right after stop
+            out = None
+            use_pipe = recording_mode in ('pipe', 'copy')
+            if use_pipe:
+                out = FFmpegPipeWriter(output_path, fps, (w, h), ffmpeg_path=config.FFMPEG_PATH)
+                if out.isOpened():
+                    video_logger.info(f"FFmpeg pipe writer initialized", extra={'context': {'path': output_path, 'res': f"{w}x{h}", 'fps': fps}})
+                else:
+                    video_logger.warning(f"FFmpeg pipe unavailable, falling back to MJPEG recording", extra={'context': {'rec_id': recording_id}})
+                    out.close(timeout=5)
+                    out = None
+                    use_pipe = False
             
-            if not out.isOpened():
-                video_logger.error(f"Failed to open MJPEG writer at {temp_path}")
-                return
+            if out is None:
+                # MJPEG Writer (100% reliable in OpenCV)
+                fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+                # [ANTIGRAVITY] Direct Blocking Init (Safe in Worker Thread)
+                out = cv2.VideoWriter(temp_path, fourcc, fps, (w, h))
                 
-            video_logger.info(f"MJPEG writer initialized", extra={'context': {'path': temp_path, 'res': f"{w}x{h}", 'fps': fps}})
+                if not out.isOpened():
+                    video_logger.error(f"Failed to open MJPEG writer at {temp_path}")
+                    return
+                    
+                video_logger.info(f"MJPEG writer initialized", extra={'context': {'path': temp_path, 'res': f"{w}x{h}", 'fps': fps}})
             
             # Recording loop
-            last_ts = 0
+            # SYNC STRATEGY: Consume the camera's sequenced ring buffer so every
+            # captured frame is written (at least once), even after a slow write.
+            last_seq = camera.frames.seq
             frames_written = 0
+            frames_missed = 0
+            first_ts = None
+            previous = None
             
             try:
                 while not stop_event.is_set():
-                    # SYNC STRATEGY: Poll faster than FPS, write only new frames
-                    current_ts = camera.last_update
+                    frames, missed = camera.frames_since(last_seq, consumer=f"recorder:{recording_id}")
+                    
+                    if missed:
+                        frames_missed += missed
+                        video_logger.warning(f"Recorder fell behind, {missed} frame(s) skipped", extra={'context': {'rec_id': recording_id}})
                     
-                    if current_ts > last_ts:
-                        frame = camera.get_raw_frame()
-                        if frame is not None:
-                            # [ANTIGRAVITY] Direct Blocking Write (Safe in Worker Thread)
-                            out.write(frame)
-                            
-                            last_ts = current_ts
+                    for seq, ts, frame in frames:
+                        if first_ts is None:
+                            first_ts = ts
+                        # Constant frame rate: a real gap in capture time (fps stepped down,
+                        # stalls) is padded with the previous frame so the file keeps
+                        # real-time duration; capture jitter never drops a frame
+                        due = round((ts - first_ts) * fps) + 1
+                        while previous is not None and frames_written < due - 1:
+                            out.write(previous)
                             frames_written += 1
-                            # Burst protection: If we write a frame, don't sleep essentially, 
-                            # just yield to let other threads run
-                            time.sleep(0.001) 
-                    else:
-                        # Wait for new frame (poll)
-                        time.sleep(0.005) # 5ms poll is fast enough for 30fps (33ms)
+                        # [ANTIGRAVITY] Direct Blocking Write (Safe in Worker Thread)
+                        out.write(frame)
+                        frames_written += 1
+                        previous = frame
+                        last_seq = seq
+                    
+                    # Sleep until the capture thread publishes the next frame
+                    # (timeout keeps stop_event responsive)
+                    camera.wait_for_frame(last_seq, timeout=0.5)
             except Exception as e:
                 print(f"[Recording] ❌ Loop error: {e}")
             finally:
+                release_recording_camera()
+                
                 # CRITICAL: Always release the file handle
-                if out:
+                if use_pipe:
+                    # Only the encoder flush remains (no transcode)
+                    if out.close(timeout=30) and os.path.exists(output_path):
+                        file_size = os.path.getsize(output_path)
+                        print(f"[Recording] ✅ Final file ready: {output_path} ({file_size} bytes, {frames_written} frames)")
+                    else:
+                        print(f"[Recording] ❌ FFmpeg pipe did not produce {output_path}")
+                elif out:
                     out.release()
-                print(f"[Recording] MJPEG capture finished/stopped. Frames: {frames_written}")
+                print(f"[Recording] Capture finished/stopped. Frames: {frames_written} (missed: {frames_missed})")
             
             # ============================================================
             # FFmpeg Conversion: MJPEG (.avi) → H.264 (.mp4)
             # ============================================================
+            if use_pipe:
+                # Already encoded live, nothing left to convert
+                return
+            
             if os.path.exists(temp_path) and frames_written > 0:
                 print(f"[Recording] Converting to H.264 MP4: {output_path}")
                 
-                # FFmpeg command - OPTIMIZED for speed and lower resource usage
-                # CRF 26 = Good quality, smaller files (was 23)
-                # preset veryfast = 3x faster encoding (was medium)
-                # threads 2 = Limit CPU usage
-                # max_muxing_queue_size = Prevent buffer overflow
-                cmd = [
-                    'ffmpeg', '-y',
-                    '-i', temp_path,
-                    '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',  # Force even dimensions
-                    '-c:v', 'libx264',
-                    '-preset', 'veryfast',  # Faster encoding
-                    '-crf', '26',  # Lower quality = smaller files, still good
-                    '-pix_fmt', 'yuv420p',
-                    '-movflags', '+faststart',
-                    '-threads', '2',  # Limit CPU usage
-                    '-max_muxing_queue_size', '1024',  # Prevent buffer overflow
-                    output_path
-                ]
+                cmd = _mjpeg_transcode_cmd(temp_path, output_path)
                 
                 print(f"[Recording] Running FFmpeg: {' '.join(cmd)}")
 
                 # Run FFmpeg with lower priority (Windows)
-                import sys
-                if sys.platform == 'win32':
-                    process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        creationflags=subprocess.BELOW_NORMAL_PRIORITY_CLASS
-                    )
-                else:
-                    process = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE
-                    )
+                process, _, stderr_file = _popen_low_priority(cmd)
                 
-                # Wait 0.5s for FFmpeg to open the file
-                time.sleep(0.5)
-                
-                # Delete temp file EARLY while FFmpeg is reading it
-                # FFmpeg keeps file handle open, so it can still read
-                try:
-                    os.remove(temp_path)
-                    print(f"[Recording] ✅ Temp file deleted early (FFmpeg still reading)")
-                except Exception as e:
-                    print(f"[Recording] Temp file locked by FFmpeg: {e}")
+                # The .avi is kept until the conversion succeeded: after a restart
+                # mid-conversion, finalization converts it again (_recover_video_output)
                 
                 # Wait for FFmpeg to finish
-                stdout, stderr = process.communicate(timeout=60)
-                returncode = process.returncode
+                try:
+                    returncode = wait_process(process, 60)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    stderr_file.close()
+                    raise
                 
                 if returncode == 0:
                     print(f"[Recording] ✅ Conversion SUCCESS!")
+                    stderr_file.close()
                     
                     # Final cleanup if temp file still exists
                     if os.path.exists(temp_path):
@@ -256,7 +729,7 @@ class RecordingService:
                     else:
                         print(f"[Recording] ❌ Final file missing after conversion!")
                 else:
-                    error_msg = stderr.decode('utf-8', errors='ignore')
+                    error_msg = _read_stderr(stderr_file)
                     print(f"[Recording] ❌ FFmpeg conversion FAILED!")
                     print(f"[Recording] Command: {' '.join(cmd)}")
                     print(f"[Recording] Error Output:\n{error_msg}")
@@ -270,6 +743,9 @@ class RecordingService:
             print(f"[Recording] ❌ Thread exception: {e}")
             print(f"[Recording] Traceback:\n{traceback.format_exc()}")
         finally:
+            # Also after an early abort (no frame, writer failed); a no-op once released
+            release_recording_camera()
+            
             # Cleanup: Ensure temp file is removed
             if os.path.exists(temp_path):
                 try:
@@ -363,14 +839,16 @@ class RecordingService:
     
     def stop_recording(self, recording_id=None, save_video=True):
         """
-        Stop active recording
+        Stop active recording.
+        Returns immediately; the file is finalized by the background
+        finalization queue (status FINALIZING until it completes).
         
         Args:
             recording_id: Recording ID (optional, will use active if None)
             save_video: Whether to save the video
         
         Returns:
-            Tuple of (success, message)
+            Tuple of (success, message, result_data)
         """
         try:
             # Get recording info
@@ -386,18 +864,9 @@ class RecordingService:
                 else:
                     return False, "No active recording found", {}
             
-            # Stop the thread
+            # Signal the thread; waiting for it is the finalization job's work
             if 'stop_event' in rec_info:
                 rec_info['stop_event'].set()
-                rec_info['stop_event'].set()
-                if 'thread' in rec_info and rec_info['thread']:
-                     try:
-                        # Wait for thread to finish (including FFmpeg)
-                        # This yields to other greenlets, so it's safe.
-                        # We give it plenty of time (e.g. 60s) for encoding.
-                        rec_info['thread'].get(timeout=60.0)
-                     except Exception as e:
-                        video_logger.error(f"Waiting for recording thread failed: {e}")
             
             # Get database record
             record = self.PackingRecord.query.get(rec_info['db_id'])
@@ -408,82 +877,36 @@ class RecordingService:
             record.waktu_selesai = datetime.now()
             record.durasi_detik = int((datetime.now() - record.waktu_mulai).total_seconds())
             
+            video_path_abs = rec_info.get('output_path')
             if save_video:
-                # Video file is already at output_path (absolute)
-                video_path_abs = rec_info.get('output_path')
-                
-                # Convert to relative path for database storage
-                import config
-                from pathlib import Path
-                
                 # [ANTIGRAVITY] ABSOLUTE PATH STORAGE
                 # Store full path to ensure files are found even if storage config changes drives
-                video_path_str = video_path_abs.replace('\\', '/') if video_path_abs else None
-                
-                # Check if file exists
-                if video_path_abs and os.path.exists(video_path_abs):
-                     size = os.path.getsize(video_path_abs)
-                     record.file_size_kb = int(size / 1024)
-                else:
-                     print(f"[Recording] Warning: Video missing at {video_path_abs}")
-                     record.file_size_kb = 0
-
-                record.file_video = video_path_str
-                record.status = 'COMPLETED'
-                
-                # Metadata generation
-                if video_path_abs and os.path.exists(video_path_abs):
-                     try:
-                        # 1. Generate Metadata JSON
-                        json_path_abs, file_hash = generate_metadata_json(
-                            record.to_dict(), video_path_abs, record.durasi_detik, record.file_size_kb
-                        )
-                        # Store absolute path for metadata too
-                        json_path_str = json_path_abs.replace('\\', '/')
-                            
-                        record.json_metadata_path = json_path_str
-                        record.sha256_hash = file_hash
-                        
-                        # 2. Generate Thumbnail
-                        # video_path_str is already the relative path we need for the hash
-                        from app.utils import generate_thumbnail
-                        generate_thumbnail(video_path_abs, video_path_str)
-                        
-                     except Exception as e:
-                        print(f"[Recording] Metadata/Thumbnail failed: {e}")
-
+                record.file_video = video_path_abs.replace('\\', '/') if video_path_abs else None
+                record.status = 'FINALIZING'
             else:
                 record.status = 'CANCELLED'
-                # Delete video file
-                video_path = rec_info.get('output_path')
-                if video_path and os.path.exists(video_path):
-                    try:
-                        os.remove(video_path)
-                        print(f"[Recording] Deleted cancelled video: {video_path}")
-                    except Exception as e:
-                        print(f"[Recording] Error deleting cancelled video: {e}")
             
             self.db.session.commit()
             
-            # Check file existence explicitly using the absolute path we already have
-            file_exists_status = os.path.exists(video_path_abs) if video_path_abs else False
-
+            from app.services.finalization_service import finalization_queue
+            finalization_queue.enqueue({
+                'recording_id': recording_id,
+                'db_id': record.id,
+                'output_path': video_path_abs,
+                'save_video': save_video,
+                'thread': rec_info.get('thread')
+            })
+            
             result_data = {
+                'recording_id': recording_id,
+                'status': record.status,
                 'video_url': f"/recordings/{record.file_video}" if record.file_video else None,
                 'duration': record.durasi_detik,
                 'size_kb': record.file_size_kb,
-                'file_exists': file_exists_status
+                'file_exists': os.path.exists(video_path_abs) if video_path_abs else False
             }
             
-
-            
-            video_logger.info(f"Stopped recording {recording_id}")
-            audit_logger.info(f"RECORDING STOPPED", extra={'context': {
-                'resi': record.resi, 
-                'duration': record.durasi_detik,
-                'size_kb': record.file_size_kb,
-                'status': record.status
-            }})
+            video_logger.info(f"Stopped recording {recording_id}, finalization queued")
             return True, "Recording stopped successfully", result_data
             
         except Exception as e:
@@ -491,6 +914,117 @@ class RecordingService:
             self.db.session.rollback()
             return False, f"Error: {str(e)}", {}
     
+    def finalize_recording(self, job, report=None):
+        """
+        Finish a stopped recording: wait for the encoder, write metadata
+        and thumbnail, then commit the final status.
+        Runs on the finalization worker inside an app context.
+        
+        Args:
+            job: Job dict queued by stop_recording (or recovered at startup)
+            report: Optional callback, called with each completed stage name
+        
+        Returns:
+            Result dictionary, or None if the record no longer exists
+        """
+        report = report or (lambda stage: None)
+        
+        # 1. Wait for the recording thread (encoder flush / MJPEG transcode)
+        thread = job.get('thread')
+        if thread:
+            try:
+                thread.get(timeout=60.0)
+            except Exception as e:
+                video_logger.error(f"Waiting for recording thread failed: {e}")
+        report('capture')
+        
+        record = self.PackingRecord.query.get(job['db_id'])
+        if not record:
+            return None
+        
+        video_path_abs = job.get('output_path') or record.file_video
+        
+        if not job.get('save_video', True):
+            # Delete video file
+            if video_path_abs and os.path.exists(video_path_abs):
+                try:
+                    os.remove(video_path_abs)
+                    print(f"[Recording] Deleted cancelled video: {video_path_abs}")
+                except Exception as e:
+                    print(f"[Recording] Error deleting cancelled video: {e}")
+            report('commit')
+            audit_logger.info(f"RECORDING STOPPED", extra={'context': {
+                'resi': record.resi, 
+                'duration': record.durasi_detik,
+                'size_kb': 0,
+                'status': record.status
+            }})
+            return {
+                'recording_id': job.get('recording_id'),
+                'db_id': record.id,
+                'status': record.status,
+                'video_url': None,
+                'duration': record.durasi_detik,
+                'size_kb': 0,
+                'file_exists': False
+            }
+        
+        # 2. Metadata JSON (full SHA-256 read, off the event loop)
+        # An unplayable output is converted again from a leftover .avi (restart
+        # mid-transcode); opening the file runs off the event loop
+        file_exists = _finalize_pool.apply(_recover_video_output, (video_path_abs,))
+        if file_exists:
+            record.file_size_kb = int(os.path.getsize(video_path_abs) / 1024)
+            try:
+                json_path_abs, file_hash = _finalize_pool.apply(
+                    generate_metadata_json,
+                    (record.to_dict(), video_path_abs, record.durasi_detik, record.file_size_kb)
+                )
+                # Store absolute path for metadata too
+                record.json_metadata_path = json_path_abs.replace('\\', '/')
+                record.sha256_hash = file_hash
+            except Exception as e:
+                print(f"[Recording] Metadata failed: {e}")
+        else:
+            print(f"[Recording] ❌ Video missing or unplayable at {video_path_abs}")
+            record.file_size_kb = 0
+        report('metadata')
+        
+        # 3. Thumbnail
+        if file_exists:
+            try:
+                from app.utils import generate_thumbnail
+                _finalize_pool.apply(generate_thumbnail, (video_path_abs, record.file_video))
+            except Exception as e:
+                print(f"[Recording] Thumbnail failed: {e}")
+        report('thumbnail')
+        
+        # 4. Commit (a recording without a usable video is a failed one)
+        if file_exists:
+            record.status = 'COMPLETED'
+        else:
+            record.status = 'ERROR'
+            record.error_message = "Finalization failed: video file missing or unplayable"
+        self.db.session.commit()
+        report('commit')
+        
+        audit_logger.info(f"RECORDING STOPPED", extra={'context': {
+            'resi': record.resi, 
+            'duration': record.durasi_detik,
+            'size_kb': record.file_size_kb,
+            'status': record.status
+        }})
+        
+        return {
+            'recording_id': job.get('recording_id'),
+            'db_id': record.id,
+            'status': record.status,
+            'video_url': f"/recordings/{record.file_video}" if record.file_video else None,
+            'duration': record.durasi_detik,
+            'size_kb': record.file_size_kb,
+            'file_exists': file_exists
+        }
+    
     def cancel_recording(self, recording_id=None):
         """
         Cancel active recording without saving
@@ -34,7 +34,7 @@ class ResourceMonitor:
             disk_percent = disk.percent
             
             # Count active cameras and recordings
-            from app.services.camera_service import active_cameras
+            from app.services.camera_service import active_cameras, get_camera_stats, capture_scheduler
             from app.services.recording_service import active_recordings
             
             cameras_count = len(active_cameras)
@@ -46,6 +46,8 @@ class ResourceMonitor:
                 'disk': round(disk_percent, 1),
                 'cameras': cameras_count,
                 'recordings': recordings_count,
+                'camera_stats': [self.summarize_camera_stats(s) for s in get_camera_stats()],
+                'scheduler': capture_scheduler.get_stats(),
                 'timestamp': time.time()
             }
         except Exception as e:
@@ -56,9 +58,33 @@ class ResourceMonitor:
                 'disk': 0,
                 'cameras': 0,
                 'recordings': 0,
+                'camera_stats': [],
                 'timestamp': time.time()
             }
     
+    @staticmethod
+    def summarize_camera_stats(stats):
+        """Compact per-camera telemetry for the periodic broadcast (full detail: /api/cameras/stats)"""
+        read_ms = stats.get('read_ms') or {}
+        encode_ms = stats.get('encode_ms') or {}
+        consumers = stats.get('viewers', []) + stats.get('consumers', [])
+        return {
+            'url': stats['url'],
+            'fps': stats['fps'],
+            'target_fps': stats['target_fps'],
+            'demand': stats['demand'],
+            'state': stats['state'],
+            'reconnects': stats['reconnects'],
+            'downtime_s': stats['downtime_s'],
+            'read_ms': read_ms.get('avg'),
+            'encode_ms': encode_ms.get('avg'),
+            'jpeg_kb': round(stats['jpeg_bytes_avg'] / 1024, 1),
+            'dropped': stats['dropped'],
+            'duplicates': stats['duplicates'],
+            'viewers': len(stats.get('viewers', [])),
+            'max_lag_ms': max((c['lag_ms'] for c in consumers), default=0),
+        }
+    
     def check_thresholds(self, ram_percent, disk_percent):
         """Check resource thresholds and emit critical warnings (No Auto-Restart)"""
         CRITICAL_THRESHOLD = 95
@@ -96,6 +122,11 @@ class ResourceMonitor:
         # Get resources
         resources = self.get_system_resources()
         
+        # Step camera capture down/up with CPU load (cameras pick it up within ~1s)
+        from app.services.capture_controller import capture_controller
+        capture_controller.update_load(resources['cpu'])
+        resources['capture'] = capture_controller.get_status()
+        
         # Emit to all connected clients
         socketio.emit('resource_update', resources)
         
@@ -75,13 +75,16 @@ def register_socketio_handlers(socketio):
         recording_id = data.get('recording_id')
         
         recording_service = RecordingService(db, PackingRecord)
-        success, message, _ = recording_service.stop_recording(recording_id, save_video=True)
+        success, message, result_data = recording_service.stop_recording(recording_id, save_video=True)
         
-        # Emit result to requesting client
-        emit('recording_stopped', {
+        # Emit result to requesting client (status FINALIZING; 'recording_finalized' follows)
+        response = {
             'success': success,
             'message': message
-        })
+        }
+        if result_data:
+            response.update(result_data)
+        emit('recording_stopped', response)
         
         # Broadcast status update to all clients
         status = recording_service.get_recording_status()
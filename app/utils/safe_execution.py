@@ -1,10 +1,17 @@
 """
 Safe Execution Utilities
 ========================
-Decorators and helpers for crash-proof execution of functions.
+Decorators and helpers for crash-proof execution of functions, and for
+running child processes from worker threads under gevent.
 """
 import functools
+import subprocess
+import time
 import traceback
+
+import gevent
+from gevent import monkey
+
 from app.utils.logger import app_logger
 
 def safe_socket_handler(f):
@@ -52,3 +59,67 @@ def safe_thread_loop(name, interval=1.0):
                 time.sleep(interval)
         return wrapper
     return decorator
+
+
+# ============================================
+# CHILD PROCESSES FROM WORKER THREADS
+# ============================================
+# Capture loops and recorder writes run on real threads (gevent ThreadPool).
+# gevent can only spawn and watch child processes on the main hub, and its
+# pipe file objects are bound to the hub that created them. From a worker
+# thread, therefore:
+# - spawn with popen_from_any_thread() (Popen runs on the main hub)
+# - talk to the child over plain OS pipes (os.pipe + os.fdopen), which any
+#   thread can block on, never over stdin=PIPE/stdout=PIPE
+# - wait with wait_process(), which polls instead of Popen.wait()
+
+_native_allocate_lock = monkey.get_original('_thread', 'allocate_lock')
+_main_hub = gevent.get_hub()
+
+
+def call_on_main_hub(fn, timeout=10.0):
+    """
+    Run fn() on the main gevent hub and return its result (re-raising its
+    exception). The calling thread blocks on a native lock.
+    """
+    if gevent.get_hub() is _main_hub:
+        return fn()
+
+    done = _native_allocate_lock()
+    done.acquire()
+    result = {}
+
+    def run():
+        try:
+            result['value'] = fn()
+        except Exception as e:
+            result['error'] = e
+        finally:
+            done.release()
+
+    _main_hub.loop.run_callback_threadsafe(gevent.spawn, run)
+    if not done.acquire(True, timeout):
+        raise TimeoutError(f"Timed out waiting for the main hub to run {getattr(fn, '__name__', fn)}")
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def popen_from_any_thread(cmd, timeout=10.0, **kwargs):
+    """subprocess.Popen that also works from threadpool threads"""
+    return call_on_main_hub(lambda: subprocess.Popen(cmd, **kwargs), timeout)
+
+
+def wait_process(process, timeout):
+    """
+    process.wait() for any thread.
+    
+    Raises:
+        subprocess.TimeoutExpired: still running after timeout seconds
+    """
+    deadline = time.time() + timeout
+    while process.poll() is None:
+        if time.time() > deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(0.05)
+    return process.returncode
@@ -0,0 +1,119 @@
+"""
+CAPTURE BACKEND BENCHMARK
+=========================
+Compares the OpenCV and ffmpeg capture backends on one camera:
+- startup: time to the first frame, and until VideoCamera would be ready
+  (OpenCV needs its 10-frame warmup, ffmpeg one complete frame)
+- steady state: frames per second and CPU (this process + ffmpeg child)
+
+Usage:
+    python benchmark_capture.py [URL] [--seconds 10] [--backend both|opencv|ffmpeg]
+"""
+
+import argparse
+import time
+
+import cv2
+import psutil
+
+import config
+from app.services.ffmpeg_capture import FFmpegCapture
+
+
+def _cpu_seconds(proc):
+    """User+system CPU of a process and all its children"""
+    total = 0.0
+    for p in [proc] + proc.children(recursive=True):
+        try:
+            t = p.cpu_times()
+            total += t.user + t.system
+        except psutil.Error:
+            pass
+    return total
+
+
+def open_opencv(url):
+    cap = cv2.VideoCapture(url)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.VIDEO_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.VIDEO_HEIGHT)
+    cap.set(cv2.CAP_PROP_FPS, config.VIDEO_FPS)
+    return cap, 10
+
+
+def open_ffmpeg(url):
+    cap = FFmpegCapture(url, config.VIDEO_WIDTH, config.VIDEO_HEIGHT,
+                        ffmpeg_path=config.FFMPEG_PATH, rtsp_transport=config.RTSP_TRANSPORT)
+    return cap, 1
+
+
+def run(name, opener, url, seconds):
+    me = psutil.Process()
+    print(f"\n[{name}] opening {url} ...")
+
+    t0 = time.perf_counter()
+    cap, warmup_reads = opener(url)
+    if not cap.isOpened():
+        print(f"[{name}] FAILED to open")
+        return None
+
+    first_frame = None
+    for i in range(warmup_reads):
+        ret, _ = cap.read()
+        if ret and first_frame is None:
+            first_frame = time.perf_counter() - t0
+        if warmup_reads > 1:
+            time.sleep(0.05)  # same pacing as VideoCamera's warmup
+    ready = time.perf_counter() - t0
+    if first_frame is None:
+        print(f"[{name}] no frames")
+        cap.release()
+        return None
+
+    frames = 0
+    cpu0 = _cpu_seconds(me)
+    t1 = time.perf_counter()
+    while time.perf_counter() - t1 < seconds:
+        ret, _ = cap.read()
+        if not ret:
+            break
+        frames += 1
+    wall = time.perf_counter() - t1
+    cpu = _cpu_seconds(me) - cpu0
+    cap.release()
+
+    result = {
+        'backend': name,
+        'first_frame_s': round(first_frame, 3),
+        'ready_s': round(ready, 3),
+        'fps': round(frames / wall, 1) if wall else 0,
+        'cpu_percent': round(100.0 * cpu / wall, 1) if wall else 0,
+        # Comparable even when the two backends deliver different frame rates
+        'cpu_ms_per_frame': round(1000.0 * cpu / frames, 2) if frames else 0,
+    }
+    print(f"[{name}] first frame {result['first_frame_s']}s, ready {result['ready_s']}s, "
+          f"{result['fps']} fps, CPU {result['cpu_percent']}% of one core "
+          f"({result['cpu_ms_per_frame']} ms/frame)")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare OpenCV and ffmpeg capture backends')
+    parser.add_argument('url', nargs='?', default=config.DEFAULT_RTSP_URL)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--backend', choices=['both', 'opencv', 'ffmpeg'], default='both')
+    args = parser.parse_args()
+
+    backends = []
+    if args.backend in ('both', 'opencv'):
+        backends.append(('opencv', open_opencv))
+    if args.backend in ('both', 'ffmpeg'):
+        backends.append(('ffmpeg', open_ffmpeg))
+
+    results = [r for r in (run(name, opener, args.url, args.seconds) for name, opener in backends) if r]
+
+    if results:
+        print("\nbackend   first_frame  ready    fps    cpu%  ms/frame")
+        for r in results:
+            print(f"{r['backend']:<9} {r['first_frame_s']:>9.3f}s {r['ready_s']:>6.3f}s {r['fps']:>6.1f} "
+                  f"{r['cpu_percent']:>6.1f} {r['cpu_ms_per_frame']:>8.2f}")
@@ -0,0 +1,97 @@
+"""
+JPEG ENCODER BENCHMARK
+======================
+Encodes the same sample frames with every available JPEG encoder and
+reports ms/frame and bytes/frame per backend and quality:
+- opencv    : cv2.imencode
+- turbojpeg : libjpeg-turbo via PyTurboJPEG (accurate and fast DCT), if installed
+
+Frames come from a recording (default: the newest video in the recordings
+folder), a camera URL or a local camera index, and are scaled like the
+preview renditions (--width 640, 0 = native).
+
+Usage:
+    python benchmark_jpeg.py [SOURCE] [--frames 60] [--width 640] [--qualities 50,60,70]
+                             [--subsampling 420]
+"""
+
+import argparse
+import time
+
+import cv2
+
+import config
+from app.services.camera_service import TurboJPEG, OpenCVJpegEncoder, TurboJpegEncoder
+
+
+def newest_recording():
+    videos = [p for p in config.RECORDINGS_FOLDER.rglob('*') if p.suffix.lower() in ('.mp4', '.avi', '.mkv')]
+    return str(max(videos, key=lambda p: p.stat().st_mtime)) if videos else None
+
+
+def load_frames(source, count, width):
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        h, w = frame.shape[:2]
+        if 0 < width < w:
+            frame = cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def build_encoders(subsampling):
+    encoders = [('opencv', OpenCVJpegEncoder(subsampling))]
+    if TurboJPEG is None:
+        print("[turbojpeg] PyTurboJPEG not installed, skipped")
+        return encoders
+    try:
+        encoders.append(('turbojpeg', TurboJpegEncoder(subsampling, fast_dct=False)))
+        encoders.append(('turbojpeg-fastdct', TurboJpegEncoder(subsampling, fast_dct=True)))
+    except Exception as e:
+        print(f"[turbojpeg] unavailable: {e}")
+    return encoders
+
+
+def run(name, encoder, frames, quality):
+    encoder.encode(frames[0], quality)  # warm up (tables, first-call allocations)
+    total_bytes = 0
+    t0 = time.perf_counter()
+    for frame in frames:
+        total_bytes += len(encoder.encode(frame, quality) or b'')
+    elapsed = time.perf_counter() - t0
+    return {
+        'backend': name,
+        'quality': quality,
+        'ms_per_frame': round(1000.0 * elapsed / len(frames), 3),
+        'kb_per_frame': round(total_bytes / len(frames) / 1024, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare JPEG encoder backends on sample frames')
+    parser.add_argument('source', nargs='?', default=None,
+                        help='video file, camera URL or index (default: newest recording)')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--width', type=int, default=640, help='scale frames to this width (0 = native)')
+    parser.add_argument('--qualities', default='50,60,70')
+    parser.add_argument('--subsampling', choices=['420', '422', '444'], default=config.JPEG_SUBSAMPLING)
+    args = parser.parse_args()
+
+    source = args.source or newest_recording() or config.DEFAULT_RTSP_URL
+    frames = load_frames(source, args.frames, args.width)
+    if not frames:
+        raise SystemExit(f"No frames read from {source}")
+    h, w = frames[0].shape[:2]
+    print(f"{len(frames)} frames {w}x{h} from {source}, subsampling {args.subsampling}")
+
+    qualities = [int(q) for q in args.qualities.split(',') if q.strip()]
+    results = [run(name, encoder, frames, q) for name, encoder in build_encoders(args.subsampling) for q in qualities]
+
+    print("\nbackend             quality  ms/frame  KB/frame")
+    for r in results:
+        print(f"{r['backend']:<19} {r['quality']:>7} {r['ms_per_frame']:>9.3f} {r['kb_per_frame']:>9.1f}")
@@ -0,0 +1,72 @@
+"""
+CAMERA COLD-START BENCHMARK
+===========================
+Measures how long N cameras take from a cold start until every one of them
+delivers its first frame, through the same path the warm pool uses
+(get_camera_stream -> capture thread -> per-device hardware lock):
+- concurrent: all cameras brought up at once (bring_up_cameras)
+- --serial:   one camera after the other, for comparison
+
+Cameras default to the enabled cameras in the stream pairs file.
+
+Usage:
+    python benchmark_startup.py [URL ...] [--serial] [--timeout 30]
+"""
+
+# Same runtime as the server: capture threads and locks must be gevent-aware
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import time
+
+import gevent
+
+from app.services.camera_service import bring_up_cameras, enabled_camera_urls, live_stream_url, retire_camera
+
+
+def stop_all(urls, timeout=15.0):
+    """Retire the cameras and wait for their hardware to be released"""
+    # Cameras are registered under the stream they decode (the paired sub-stream if any)
+    retired = [cam for cam in (retire_camera(live_stream_url(url)) for url in urls) if cam is not None]
+    deadline = time.time() + timeout
+    while any(cam.state != 'stopped' for cam in retired) and time.time() < deadline:
+        gevent.sleep(0.2)
+
+
+def run(urls, serial, timeout):
+    started = time.time()
+    if serial:
+        results = {}
+        for url in urls:
+            step = time.time()
+            seconds = bring_up_cameras([url], timeout=timeout)[url]
+            results[url] = round(step - started + seconds, 2) if seconds is not None else None
+    else:
+        results = bring_up_cameras(urls, timeout=timeout)
+    total = time.time() - started
+    stop_all(urls)
+    return results, total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure cold-start time of N cameras')
+    parser.add_argument('urls', nargs='*', help='camera URLs or indexes (default: enabled cameras)')
+    parser.add_argument('--serial', action='store_true', help='bring cameras up one after the other')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds to wait for a first frame')
+    args = parser.parse_args()
+
+    urls = args.urls or enabled_camera_urls()
+    if not urls:
+        raise SystemExit("No cameras given and none enabled")
+
+    mode = 'serial' if args.serial else 'concurrent'
+    print(f"Bringing up {len(urls)} camera(s), {mode}...")
+    results, total = run(urls, args.serial, args.timeout)
+
+    print("\ncamera                                             first frame")
+    for url, seconds in results.items():
+        shown = f"{seconds:.2f}s" if seconds is not None else 'FAILED'
+        print(f"{url[:50]:<50} {shown:>12}")
+    live = sum(1 for s in results.values() if s is not None)
+    print(f"\n{live}/{len(urls)} camera(s) live, total cold start {total:.2f}s ({mode})")
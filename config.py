@@ -64,9 +64,56 @@ try:
         APP_VERSION = config_data.get('app_version', '1.0.0')
         # [ANTIGRAVITY] Max Recording Duration (seconds)
         MAX_RECORDING_DURATION = config_data.get('max_recording_duration', 3600)
+        FFMPEG_PATH = config_data.get('ffmpeg_path', FFMPEG_PATH)
+        RTSP_TRANSPORT = config_data.get('rtsp_transport', 'tcp')
+        # Recording pipeline:
+        #   'copy'  = remux RTSP H.264 as-is (no decode), other sources use 'pipe'
+        #   'pipe'  = live H.264 via FFmpeg stdin
+        #   'mjpeg' = legacy AVI + transcode after stop
+        RECORDING_MODE = config_data.get('recording_mode', 'pipe')
+        # Camera capture loop: 'thread' (web process threadpool) or 'process' (one OS process per camera)
+        CAPTURE_MODE = config_data.get('capture_mode', 'thread')
+        # IP camera decoder: 'opencv' (cv2.VideoCapture) or 'ffmpeg' (ffmpeg frame pipe)
+        CAPTURE_BACKEND = config_data.get('capture_backend', 'opencv')
+        # HTTP MJPEG sources (DroidCam, IP Webcam): forward the device's JPEGs to viewers
+        # as-is and decode only for the recorder/scanner
+        MJPEG_PASSTHROUGH = config_data.get('mjpeg_passthrough', True)
+        VIDEO_WIDTH = config_data.get('video_width', 1280)
+        VIDEO_HEIGHT = config_data.get('video_height', 720)
+        VIDEO_FPS = config_data.get('video_fps', 30)
+        # Lower capture fps/resolution for preview-only or idle cameras and under CPU load
+        ADAPTIVE_CAPTURE = config_data.get('adaptive_capture', True)
+        # JPEG encoder: 'auto' (libjpeg-turbo via PyTurboJPEG when installed), 'turbojpeg' or 'opencv'
+        JPEG_ENCODER = config_data.get('jpeg_encoder', 'auto')
+        JPEG_SUBSAMPLING = str(config_data.get('jpeg_subsampling', '420'))
+        JPEG_FAST_DCT = config_data.get('jpeg_fast_dct', True)
+        # Pre-connect enabled cameras at startup and keep them idling at 1 FPS
+        # (IP cameras still decode every source frame: give them a sub_url)
+        WARM_CAMERA_POOL = config_data.get('warm_camera_pool', False)
+        # Capture scheduler: one thread per camera up to MAX_CAMERAS (more are rejected),
+        # plus CV_POOL_SIZE threads for short blocking OpenCV jobs (queue bounded by CV_QUEUE_LIMIT)
+        MAX_CAMERAS = config_data.get('max_cameras', 16)
+        CV_POOL_SIZE = config_data.get('cv_pool_size', 4)
+        CV_QUEUE_LIMIT = config_data.get('cv_queue_limit', 16)
 except Exception as e:
     APP_VERSION = "1.0.0"
     MAX_RECORDING_DURATION = 3600
+    RTSP_TRANSPORT = 'tcp'
+    RECORDING_MODE = 'pipe'
+    CAPTURE_MODE = 'thread'
+    CAPTURE_BACKEND = 'opencv'
+    MJPEG_PASSTHROUGH = True
+    VIDEO_WIDTH = 1280
+    VIDEO_HEIGHT = 720
+    VIDEO_FPS = 30
+    ADAPTIVE_CAPTURE = True
+    JPEG_ENCODER = 'auto'
+    JPEG_SUBSAMPLING = '420'
+    JPEG_FAST_DCT = True
+    WARM_CAMERA_POOL = False
+    MAX_CAMERAS = 16
+    CV_POOL_SIZE = 4
+    CV_QUEUE_LIMIT = 16
 
 APP_AUTHOR = "AYZARA COLLECTIONS"
 BRAND_NAME = "AYZARA"